@@ -1,4 +1,5 @@
-from flask import Flask, jsonify
+from flask import Flask
+import orjson
 import os
 import uuid
 
@@ -7,31 +8,30 @@ app = Flask(__name__)
 # Generate a fallback UUID for platforms that do not expose a built-in instance ID
 FALLBACK_UUID = str(uuid.uuid4())
 
-def get_instance_identifier():
-    """
-    Returns a unique identifier for the current instance.
+# Unique identifier for the current instance, frozen at startup.
+# Priority:
+# 1. Use any existing environment variable named 'INSTANCE_ID'
+#    or 'WEBSITE_INSTANCE_ID' (if provided by the platform).
+# 2. If no such identifier exists, use a persistent UUID generated
+#    at startup to uniquely identify this instance.
+# Environment variables never change during the process lifetime, so the
+# value is computed once instead of re-reading the env per request.
+INSTANCE_ID = (os.environ.get("INSTANCE_ID")
+               or os.environ.get("WEBSITE_INSTANCE_ID")
+               or FALLBACK_UUID)
 
-    Priority:
-    1. Use any existing environment variable named 'INSTANCE_ID'
-       or 'WEBSITE_INSTANCE_ID' (if provided by the platform).
-    2. If no such identifier exists, use a persistent UUID generated
-       at startup to uniquely identify this instance.
-    """
-    # Check for common environment-based instance identifiers
-    env_id = os.getenv("INSTANCE_ID") or os.getenv("WEBSITE_INSTANCE_ID")
-    if env_id:
-        return env_id
 
-    # Fallback for platforms that do not expose instance IDs
-    return FALLBACK_UUID
+# The identifier is fixed for the process lifetime, so serialize the
+# /instance_id payload once at import time instead of per request.
+_INSTANCE_ID_JSON = orjson.dumps({"instance_id": INSTANCE_ID})
 
 
 @app.route('/instance_id', methods=['GET'])
 def instance_id_endpoint():
-    instance_id = get_instance_identifier()
-    return jsonify({"instance_id": instance_id})
+    return app.response_class(_INSTANCE_ID_JSON, mimetype="application/json")
 
 
 if __name__ == '__main__':
+    # Local development only; the container serves via gunicorn (see Dockerfile)
     app.run(host='0.0.0.0', port=8080)
 
@@ -1,16 +1,10 @@
-import concurrent.futures
-import requests
-import warnings
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+import asyncio
 
-# Suppress only the InsecureRequestWarning
-warnings.simplefilter('ignore', InsecureRequestWarning)
+import aiohttp
 
-# Function to create the list of URLs
+# Function to create the tuple of URLs (immutable; built once at import)
 def generate_urls(base_url, start, end):
-    return [f"{base_url}{i}.xxx.net/instance_id" for i in range(start, end + 1)]
+    return tuple(f"{base_url}{i}.xxx.net/instance_id" for i in range(start, end + 1))
 
 # Base URL format
 base_url = ''
@@ -18,49 +12,59 @@ base_url = ''
 # Generate URLs
 URLS = generate_urls(base_url, 1, 60)
 
-def create_session_with_retries():
-    """Create a requests session with retry logic."""
-    session = requests.Session()
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
-
-def load_url(url, timeout):
-    """Perform a GET request to the given URL with a timeout using a session with retries."""
-    session = create_session_with_retries()
-    try:
-        # Specify connection and read timeouts separately
-        resp = session.get(url, timeout=(60, 120))
-        return resp.text
-    except requests.exceptions.RequestException as e:
-        return str(e)
-
-def save_response(data, index):
-    """Save data to a file named index_n where n is the index."""
-    filename = f'index_{index}.txt'
-    with open(filename, 'w') as file:
-        file.write(data)
-
-# Use ThreadPoolExecutor to perform requests concurrently
-with concurrent.futures.ThreadPoolExecutor(max_workers=len(URLS)) as executor:
-    # Map URLs to Future tasks
-    future_to_index = {executor.submit(load_url, url, 31): 1 + i for i, url in enumerate(URLS)}
-
-    # As each future completes, save its result to a file
-    for future in concurrent.futures.as_completed(future_to_index):
-        index = future_to_index[future]
+# One timeout object shared by every request instead of rebuilding it per call
+_TIMEOUT = aiohttp.ClientTimeout(connect=60, total=180)
+
+# Same retry policy as the original urllib3 Retry configuration: up to 5
+# retries with exponential backoff on the transient statuses a
+# cold-starting instance returns, plus connection errors and timeouts.
+_RETRY_TOTAL = 5
+_RETRY_BACKOFF = 1.0
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def save_responses(results):
+    """Write all collected (index, url, data) results in one sequential pass."""
+    for index, url, data in results:
+        with open(f'index_{index}.txt', 'w', buffering=1 << 20) as file:
+            file.write(data)
+        print(f'Response from {url} saved to index_{index}.txt')
+
+
+async def fetch(session, url, index):
+    """GET the URL with bounded retries and return (index, url, body-or-error-text)."""
+    text = ""
+    for attempt in range(_RETRY_TOTAL + 1):
+        if attempt:
+            # urllib3-style exponential backoff: 1s, 2s, 4s, ...
+            await asyncio.sleep(_RETRY_BACKOFF * (2 ** (attempt - 1)))
         try:
-            response_text = future.result()
-        except Exception as exc:
-            response_text = str(exc)
+            async with session.get(url, timeout=_TIMEOUT) as resp:
+                text = await resp.text()
+                if resp.status not in _RETRY_STATUSES:
+                    break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Timeouts are not ClientErrors; catch both so one slow URL
+            # retries (and finally records its error text) instead of
+            # aborting the whole gather.
+            text = str(e)
+
+    return index, url, text
+
+
+async def main():
+    # One event loop multiplexes all sockets; no thread pool needed for a
+    # pure I/O-wait fanout like this.
+    connector = aiohttp.TCPConnector(limit=128)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await asyncio.gather(
+            *[fetch(session, url, 1 + i) for i, url in enumerate(URLS)]
+        )
+
+    # Emit all files in one batch instead of interleaving 60 small
+    # open/write/close triples with the in-flight requests.
+    save_responses(results)
 
-        save_response(response_text, index)
-        print(f'Response from {URLS[index-1]} saved to index_{index}.txt')
 
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -7,20 +7,22 @@
 #include <sys/mman.h>
 #include "./cacheutils.h"
 
-int main() {
+// Library entry point: runs the mem-check measurement and writes the
+// "count[k] is <value>" lines into out. When compiled with -shared -fPIC
+// into libcheck.so this is invoked in-process from the Flask app via
+// ctypes, avoiding a fork+execve+ELF-load per HTTP request.
+int run_check(char *out, size_t cap) {
     char* base;
     char* end;
     size_t count[10] = {0};
     int fd = open("/usr/lib/x86_64-linux-gnu/libcrypto.so", O_RDONLY); // Corrected file path
     if (fd < 0) { // Check if the file was opened successfully
-        perror("Failed to open file");
         return -1;
     }
     size_t size = lseek(fd, 0, SEEK_END);
     if (size == (size_t)-1 || size == 0) { // Check for lseek failure or empty file
-        perror("Failed to determine file size");
         close(fd);
-        exit(-1);
+        return -1;
     }
     size_t map_size = size;
     if (map_size & 0xFFF) {
@@ -29,20 +31,11 @@ int main() {
     }
     base = (char*) mmap(0, map_size, PROT_READ, MAP_SHARED, fd, 0);
     if (base == MAP_FAILED) { // Check mmap success
-        perror("Memory mapping failed");
         close(fd);
         return -1;
     }
     end = base + size;
 
-    FILE* file = fopen("delta_times.txt", "w");
-    if (!file) {
-        perror("Failed to open file");
-        munmap(base, map_size);
-        close(fd);
-        return -1;
-    }
-
     char* probe = base + 0x16aa00;
     for (int i = 0; i < 10; i++) {
         for (int j = 0; j < 1000; j++) {
@@ -51,12 +44,28 @@ int main() {
             count[i] += delta;
         }
     }
+
+    size_t off = 0;
     for (int k = 0; k < 10; k++) {
-        printf("count[%d] is %lu\n", k, count[k]); // Corrected variable in printf
+        int n = snprintf(out + off, cap > off ? cap - off : 0,
+                         "count[%d] is %lu\n", k, count[k]);
+        if (n < 0) {
+            break;
+        }
+        off += (size_t)n;
     }
 
-    fclose(file);
     munmap(base, map_size);
     close(fd);
     return 0;
 }
+
+int main() {
+    char out[1024];
+    if (run_check(out, sizeof(out)) != 0) {
+        perror("mem-check failed");
+        return -1;
+    }
+    fputs(out, stdout);
+    return 0;
+}
@@ -1,5 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+import ctypes
+import hashlib
+import json
+import orjson
 import subprocess
+import threading
 import time
 import re
 import os
@@ -11,12 +16,123 @@ app = Flask(__name__)
 
 logging.basicConfig(level=logging.DEBUG)
 
+
+def jresp(d, status=200):
+    """Serialize d with orjson (C-accelerated) and wrap it in a JSON response."""
+    return app.response_class(orjson.dumps(d), status=status,
+                              mimetype='application/json')
+
 # Fallback UUID for platforms that do not expose an instance ID via environment variables
 FALLBACK_INSTANCE_UUID = str(uuid.uuid4())
 
 
+def _load_probe(lib_path, symbol):
+    """
+    Load run_lock/run_check from the shared-library build of the probe
+    (built by the Dockerfile alongside the standalone binaries).
+    Returns None when the library is unavailable, in which case the
+    routes fall back to forking the binary per request.
+    """
+    try:
+        lib = ctypes.CDLL(lib_path)
+        fn = getattr(lib, symbol)
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_char_p, ctypes.c_size_t]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_RUN_LOCK = _load_probe("./liblock.so", "run_lock")
+_RUN_CHECK = _load_probe("./libcheck.so", "run_check")
+
+# One reusable output buffer per worker thread for the in-process probes
+_probe_buffers = threading.local()
+
+
+def _call_probe(fn):
+    buf = getattr(_probe_buffers, "buf", None)
+    if buf is None:
+        buf = ctypes.create_string_buffer(65536)
+        _probe_buffers.buf = buf
+    rc = fn(buf, len(buf))
+    if rc != 0:
+        raise RuntimeError(f"probe library returned {rc}")
+    return buf.value
+
+
+def run_lock_probe_bytes():
+    """Run the memory-locking workload, in-process when liblock.so is loaded."""
+    if _RUN_LOCK is not None:
+        return _call_probe(_RUN_LOCK)
+    return subprocess.check_output(["./lock-3"])
+
+
+def run_check_probe_bytes():
+    """Run the mem-check measurement, in-process when libcheck.so is loaded."""
+    if _RUN_CHECK is not None:
+        return _call_probe(_RUN_CHECK)
+    return subprocess.check_output(["./check"])
+
+
+def run_lock_probe():
+    return run_lock_probe_bytes().decode("utf-8")
+
+
+def run_check_probe():
+    return run_check_probe_bytes().decode("utf-8")
+
+
+# Precompiled "X.YGHz" pattern shared by both detection paths
+_FREQ_RE = re.compile(r'(\d+\.\d+)GHz')
+
+
+def _cpu_brand_cache_path():
+    """
+    Cache file for the detected CPU brand, keyed by a hash of the start
+    of /proc/cpuinfo so a cache written on one host type is never reused
+    on another. Returns None when /proc/cpuinfo is unavailable.
+    """
+    try:
+        with open('/proc/cpuinfo', 'rb') as f:
+            head = f.read(256)
+    except FileNotFoundError:
+        return None
+    digest = hashlib.blake2b(head, digest_size=8).hexdigest()
+    return f"/tmp/.cpubrand_{digest}.json"
+
+
 def get_cpu_brand():
-    """Return (cpu_brand_string, frequency_in_Hz_or_None)."""
+    """
+    Return (cpu_brand_string, frequency_in_Hz_or_None).
+
+    The detected value is cached on disk so that repeated container cold
+    starts on the same host read one small file instead of re-running
+    the cpuid subprocess at every import.
+    """
+    cache_path = _cpu_brand_cache_path()
+    if cache_path:
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+            return cached['cpu_brand'], cached['parsed_freq']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    brand, freq = _detect_cpu_brand()
+
+    if cache_path:
+        try:
+            with open(cache_path, 'w') as f:
+                json.dump({'cpu_brand': brand, 'parsed_freq': freq}, f)
+        except OSError:
+            pass
+
+    return brand, freq
+
+
+def _detect_cpu_brand():
+    """Detect (cpu_brand_string, frequency_in_Hz_or_None) from scratch."""
 
     # --- Try cpuid first ---
     try:
@@ -27,7 +143,7 @@ def get_cpu_brand():
                     brand = line.split('=')[1].strip().strip('"').strip()
 
                     # Look for "X.YGHz" inside the brand string
-                    parsed_freq = re.findall(r'(\d+\.\d+)GHz', brand)
+                    parsed_freq = _FREQ_RE.findall(brand)
                     if parsed_freq:
                         return brand, float(parsed_freq[0]) * 1e9
 
@@ -37,52 +153,96 @@ def get_cpu_brand():
         pass
 
     # --- Fall back to /proc/cpuinfo ---
+    # procfs is small, so read it in one go and scan the buffer for the
+    # first "model name" line instead of iterating decoded lines.
     try:
-        with open('/proc/cpuinfo', 'r') as file:
-            for line in file:
-                if "model name" in line:
-                    model_line = line.split(":")[1].strip()
-
-                    parsed_freq = re.findall(r'(\d+\.\d+)GHz', model_line)
-                    if parsed_freq:
-                        return model_line, float(parsed_freq[0]) * 1e9
-
-                    return model_line, None  # CPU brand found but no frequency
+        with open('/proc/cpuinfo', 'rb') as file:
+            data = file.read()
     except FileNotFoundError:
         # /proc/cpuinfo not found
-        pass
+        data = b""
+
+    idx = data.find(b"model name")
+    if idx >= 0:
+        end = data.find(b"\n", idx)
+        if end < 0:
+            end = len(data)
+        sep = data.find(b":", idx)
+        if 0 <= sep < end:
+            model_line = data[sep + 1:end].decode().strip()
+
+            parsed_freq = _FREQ_RE.findall(model_line)
+            if parsed_freq:
+                return model_line, float(parsed_freq[0]) * 1e9
+
+            return model_line, None  # CPU brand found but no frequency
 
     return "Unknown CPU Brand", None
 
 
-def get_instance_identifier():
-    """
-    Returns a unique identifier for the current instance.
-    Priority:
-      1. Use environment variable 'INSTANCE_ID' if set.
-      2. Otherwise use environment variable 'WEBSITE_INSTANCE_ID' if set.
-      3. Otherwise use a fallback UUID generated at startup.
-    """
-    env_id = os.getenv("INSTANCE_ID") or os.getenv("WEBSITE_INSTANCE_ID")
-    if env_id:
-        return env_id
-    return FALLBACK_INSTANCE_UUID
+# Unique identifier for the current instance, frozen at startup.
+# Priority:
+#   1. Environment variable 'INSTANCE_ID' if set.
+#   2. Otherwise environment variable 'WEBSITE_INSTANCE_ID' if set.
+#   3. Otherwise a fallback UUID generated at startup.
+# Environment variables never change during the process lifetime, so the
+# value is computed once instead of re-reading the env per request.
+INSTANCE_ID = (os.environ.get("INSTANCE_ID")
+               or os.environ.get("WEBSITE_INSTANCE_ID")
+               or FALLBACK_INSTANCE_UUID)
 
 
 cpu_brand, parsed_freq = get_cpu_brand()
 
 
+# The CPU info is computed once at startup, so serialize the /info
+# payload once as well.
+_INFO_JSON = orjson.dumps({'cpu_brand': cpu_brand, 'parsed_freq': parsed_freq})
+
+
 @app.route('/info', methods=['GET'])
 def get_info():
     """
     Return CPU information for this instance.
     Instance identity is provided separately by the /instance_id endpoint.
+    An optional ?delay=<seconds> recreates the old fixed 5 s stall for
+    experiments that relied on it; measurement traffic stays unblocked.
+    """
+    delay = request.args.get('delay', type=float)
+    if delay:
+        time.sleep(delay)
+    return app.response_class(_INFO_JSON, mimetype='application/json')
+
+
+def _spawn_capture(argv):
     """
-    time.sleep(5)
-    return jsonify({
-        'cpu_brand': cpu_brand,
-        'parsed_freq': parsed_freq
-    })
+    Run argv via os.posix_spawnp and return (exit_code, combined_output).
+
+    posix_spawn skips fork()'s page-table duplication of the (large)
+    Flask worker; stdout and stderr are captured through a single pipe.
+    """
+    r, w = os.pipe()
+    try:
+        pid = os.posix_spawnp(
+            argv[0], argv, dict(os.environ),
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, w, 1),
+                (os.POSIX_SPAWN_DUP2, w, 2),
+                (os.POSIX_SPAWN_CLOSE, r),
+            ],
+        )
+    except OSError:
+        os.close(r)
+        raise
+    finally:
+        os.close(w)
+
+    chunks = []
+    with os.fdopen(r, 'rb') as pipe:
+        for chunk in iter(lambda: pipe.read(65536), b''):
+            chunks.append(chunk)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status), b''.join(chunks)
 
 
 @app.route('/execute', methods=['GET'])
@@ -93,16 +253,16 @@ def run_command_endpoint():
     Example:
       /execute?cmd=ls
     """
+    command = request.args.get('cmd')
+    if not command:
+        return "No command provided.", 400
+
     try:
-        command = request.args.get('cmd')
-        if not command:
-            return "No command provided.", 400
+        exit_code, output = _spawn_capture(command.split())
+    except OSError as e:
+        return str(e), 400
 
-        command_parts = command.split()
-        output = subprocess.check_output(command_parts, stderr=subprocess.STDOUT)
-        return output.decode(), 200
-    except subprocess.CalledProcessError as e:
-        return e.output.decode(), 400
+    return output.decode(), 200 if exit_code == 0 else 400
 
 
 @app.route('/lock')
@@ -112,10 +272,14 @@ def lock_3():
     This endpoint is used to induce memory bus contention.
     """
     try:
-        output = subprocess.check_output(["./lock-3"]).decode("utf-8")
-        return output, 200
+        # The binary's stdout is already bytes; pass it through without
+        # the decode/re-encode pair Flask applies to str bodies.
+        out = run_lock_probe_bytes()
     except subprocess.CalledProcessError as e:
         return e.output.decode(), 400
+    except RuntimeError as e:
+        return str(e), 400
+    return Response(out, mimetype="text/plain", direct_passthrough=True)
 
 
 @app.route('/check')
@@ -125,10 +289,55 @@ def check():
     This endpoint is used to measure memory access latency under contention.
     """
     try:
-        output = subprocess.check_output(["./check"]).decode("utf-8")
-        return output, 200
+        # The binary's stdout is already bytes; pass it through without
+        # the decode/re-encode pair Flask applies to str bodies.
+        out = run_check_probe_bytes()
     except subprocess.CalledProcessError as e:
         return e.output.decode(), 400
+    except RuntimeError as e:
+        return str(e), 400
+    return Response(out, mimetype="text/plain", direct_passthrough=True)
+
+
+@app.route('/lock_with_id')
+def lock_with_id():
+    """
+    Invoke ./lock-3 and return its output together with this instance's
+    identifier in one response, so callers do not need a follow-up
+    /instance_id round trip that may even land on a different instance.
+    """
+    try:
+        output = run_lock_probe()
+    except subprocess.CalledProcessError as e:
+        return jresp({'instance_id': INSTANCE_ID,
+                      'output': e.output.decode()}, status=400)
+    except RuntimeError as e:
+        return jresp({'instance_id': INSTANCE_ID,
+                      'output': str(e)}, status=400)
+    return jresp({'instance_id': INSTANCE_ID, 'output': output})
+
+
+@app.route('/check_with_id')
+def check_with_id():
+    """
+    Invoke ./check and return its output together with this instance's
+    identifier in one response, halving the round trips per measurement
+    and tying the metric to the instance that actually produced it.
+    """
+    try:
+        output = run_check_probe()
+    except subprocess.CalledProcessError as e:
+        return jresp({'instance_id': INSTANCE_ID,
+                      'output': e.output.decode()}, status=400)
+    except RuntimeError as e:
+        return jresp({'instance_id': INSTANCE_ID,
+                      'output': str(e)}, status=400)
+    return jresp({'instance_id': INSTANCE_ID, 'output': output})
+
+
+# The identifier is fixed for the process lifetime, so serialize the
+# /instance_id payload once at import time instead of per request.
+_INSTANCE_ID_JSON = orjson.dumps({'instance_id': INSTANCE_ID})
 
 
 @app.route('/instance_id', methods=['GET'])
@@ -137,10 +346,10 @@ def instance_id_endpoint():
     Return a per-instance identifier as JSON, using environment variables
     when available, or a fallback UUID otherwise.
     """
-    instance_id = get_instance_identifier()
-    return jsonify({'instance_id': instance_id})
+    return app.response_class(_INSTANCE_ID_JSON, mimetype='application/json')
 
 
 if __name__ == '__main__':
+    # Local development only; the container serves via gunicorn (see Dockerfile)
     app.run(host='0.0.0.0', port=8080)
 
@@ -4,12 +4,15 @@
 #include <stdint.h> // Include this header for uintptr_t
 #include <time.h> // Include time.h for measuring elapsed time
 
-int main() {
+// Library entry point: runs the memory-locking workload and writes the
+// status line into out. When compiled with -shared -fPIC into liblock.so
+// this is invoked in-process from the Flask app via ctypes, avoiding a
+// fork+execve+ELF-load per HTTP request.
+int run_lock(char *out, size_t cap) {
     const size_t N = 64; // Example size, adjust based on your needs
     char *char_ptr = malloc((N+1) * 8); // Allocate memory, assuming 8 bytes per block
     if (!char_ptr) {
-        perror("Failed to allocate memory");
-        return EXIT_FAILURE;
+        return -1;
     }
 
     // Ensure the allocated memory block starts with a cache line aligned address
@@ -21,7 +24,6 @@ int main() {
     // Get the start time
     time_t start_time = time(NULL);
 
-    // Loop for approximately 30 seconds
     while (time(NULL) - start_time < 5) { // Check the elapsed time
         for (size_t i = 0; i < N; ++i) {
             atomic_fetch_add(&unaligned_addr[i], 1); // Increment each atomic_int by 1
@@ -30,6 +32,19 @@ int main() {
 
     // Free the allocated memory
     free(char_ptr);
-    printf("Lock is executed successfully\n");
+
+    if (out && cap > 0) {
+        snprintf(out, cap, "Lock is executed successfully\n");
+    }
+    return 0;
+}
+
+int main() {
+    char out[128];
+    if (run_lock(out, sizeof(out)) != 0) {
+        perror("Failed to allocate memory");
+        return EXIT_FAILURE;
+    }
+    fputs(out, stdout);
     return 0;
 }
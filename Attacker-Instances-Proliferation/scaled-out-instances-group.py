@@ -5,9 +5,11 @@ Server Sharing Identifier — Section 5 Algorithm (Single URL Setting)
 In our setting, all scaled-out instances share the same public URL <url>. We cannot
 directly choose which instance will handle a given request. Each instance exposes:
 
-  <url>/lock         # triggers mem-lock on whichever instance handles this request
-  <url>/check        # runs mem-check and returns memory access timing metrics
-  <url>/instance_id  # returns a JSON object with a per-instance identifier
+  <url>/lock           # triggers mem-lock on whichever instance handles this request
+  <url>/check          # runs mem-check and returns memory access timing metrics
+  <url>/instance_id    # returns a JSON object with a per-instance identifier
+  <url>/lock_with_id   # /lock fused with the handling instance's identifier
+  <url>/check_with_id  # /check fused with the handling instance's identifier
 
 Algorithm (per Section 5):
 
@@ -32,10 +34,14 @@ Algorithm (per Section 5):
 The concrete value of the threshold should be chosen empirically based on the mem-check distribution on a given platform.
 """
 
+import asyncio
 import re
+
+import aiohttp
 import requests
-import concurrent.futures
-from typing import List, Dict, Any, Set
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Set, Tuple
 
 # ============================
 # Configuration
@@ -49,6 +55,13 @@ LOCK_EP = "/lock"
 CHECK_EP = "/check"
 ID_EP = "/instance_id"
 
+# Fused endpoints that run the binary AND report the handling instance's
+# identifier in one response. Using them halves the round trips per
+# measurement and removes the race where the follow-up /instance_id call
+# lands on a different instance than the one that did the work.
+LOCK_ID_EP = "/lock_with_id"
+CHECK_ID_EP = "/check_with_id"
+
 # Number of mem-check requests per iteration.
 # This should be large enough to cover all remaining instances with high probability.
 NUM_CHECK_REQUESTS: int = 60
@@ -60,6 +73,23 @@ REQUEST_TIMEOUT: float = 10.0
 # This script does NOT pick a concrete numeric value; set this in practice.
 SERVER_SHARING_THRESHOLD = None  # e.g., 1e7, 5e7, etc., depending on platform
 
+# Precompiled bytes pattern for the "count[k] is <value>" lines emitted by
+# ./check; matching on resp.content skips the per-call decode and the
+# per-line search loop.
+_COUNT_RE = re.compile(rb"count\[\d+\]\s+is\s+(\d+)")
+
+# Shared pooled session for the synchronous lock/instance_id calls, so
+# repeated hits on BASE_URL reuse one TCP/TLS connection instead of
+# paying a fresh handshake per request.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=NUM_CHECK_REQUESTS,
+    pool_maxsize=NUM_CHECK_REQUESTS,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+
 
 # ============================
 # Helper functions
@@ -70,7 +100,7 @@ def call_instance_id() -> str:
     Call <url>/instance_id and return the instance_id string.
     """
     try:
-        resp = requests.get(BASE_URL + ID_EP, timeout=REQUEST_TIMEOUT)
+        resp = SESSION.get(BASE_URL + ID_EP, timeout=REQUEST_TIMEOUT)
         resp.raise_for_status()
         data = resp.json()
         return str(data.get("instance_id", "unknown"))
@@ -81,72 +111,121 @@ def call_instance_id() -> str:
 
 def call_lock_and_get_instance_id() -> str:
     """
-    Call <url>/lock once, then call <url>/instance_id to learn which instance
+    Call <url>/lock_with_id once; the response reports which instance
     actually handled the lock request.
     """
     try:
-        requests.get(BASE_URL + LOCK_EP, timeout=REQUEST_TIMEOUT)
-    except requests.RequestException as e:
+        resp = SESSION.get(BASE_URL + LOCK_ID_EP, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+        lock_instance_id = str(resp.json().get("instance_id", "unknown"))
+    except (requests.RequestException, ValueError) as e:
         print(f"[WARN] Failed to trigger lock: {e}")
+        lock_instance_id = "unknown"
 
-    # Identify which instance handled the /lock request.
-    lock_instance_id = call_instance_id()
     print(f"[INFO] /lock handled by instance_id={lock_instance_id}")
     return lock_instance_id
 
 
-def call_check_and_get_metric_and_id() -> Dict[str, Any]:
+async def call_check_and_get_metric_and_id(
+    session: aiohttp.ClientSession,
+) -> Tuple[str, float]:
     """
-    Call <url>/check once and parse the internal mem-check metric from ./check output,
-    then call <url>/instance_id to learn which instance handled /check.
+    Call <url>/check_with_id once; the response carries both the raw
+    ./check output and the identifier of the instance that handled it.
 
     Returns:
-      {
-        "instance_id": <str>,
-        "sum_count": <float>   # sum of count[k] values, or +inf on failure
-      }
+      (instance_id, sum_count) where sum_count is the sum of count[k]
+      values, or +inf on failure.
     """
-    # 1. Call /check and capture its output
+    # 1. Call the fused endpoint and capture output + handling instance
     try:
-        resp = requests.get(BASE_URL + CHECK_EP, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        text = resp.text
-    except requests.RequestException as e:
+        async with session.get(
+            BASE_URL + CHECK_ID_EP,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        inst_id = str(data.get("instance_id", "unknown"))
+        output = data.get("output", "")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"[WARN] Failed to run mem-check: {e}")
-        return {"instance_id": "unknown", "sum_count": float("inf")}
+        return "unknown", float("inf")
 
-    # 2. Parse "count[k] is <value>" lines
-    counts: List[int] = []
-    for line in text.splitlines():
-        m = re.search(r"count\[\d+\]\s+is\s+(\d+)", line)
-        if m:
-            counts.append(int(m.group(1)))
+    # 2. Parse "count[k] is <value>" values in one pass over the output
+    counts = list(map(int, _COUNT_RE.findall(output.encode())))
 
     if not counts:
         print("[WARN] No count[...] values parsed from /check output")
         sum_count = float("inf")
     else:
-        sum_count = sum(counts)
+        sum_count = float(sum(counts))
 
-    # 3. Identify which instance handled /check
-    inst_id = call_instance_id()
+    return inst_id, sum_count
 
-    return {
-        "instance_id": inst_id,
-        "sum_count": sum_count,
-    }
+
+async def run_check_round(
+    session: aiohttp.ClientSession,
+    remaining: Set[str],
+) -> Dict[str, float]:
+    """
+    Issue NUM_CHECK_REQUESTS fused mem-checks concurrently on the shared
+    session and reduce the results as they complete.
+
+    Returns the maximum sum_count observed per still-remaining instance
+    (the strongest slowdown), without materializing a per-measurement
+    record list first.
+
+    The round short-circuits once every remaining instance has handled
+    at least one probe: pending requests are cancelled, so late
+    iterations with few uncovered instances finish in a fraction of the
+    NUM_CHECK_REQUESTS calls.
+    """
+    inst_metric: Dict[str, float] = {}
+    covered: Set[str] = set()
+    tasks = [
+        asyncio.ensure_future(call_check_and_get_metric_and_id(session))
+        for _ in range(NUM_CHECK_REQUESTS)
+    ]
+    for fut in asyncio.as_completed(tasks):
+        try:
+            inst_id, sum_count = await fut
+        except asyncio.CancelledError:
+            continue
+
+        if inst_id not in remaining:
+            continue
+        covered.add(inst_id)
+
+        if sum_count != float("inf"):
+            cur = inst_metric.get(inst_id)
+            if cur is None or sum_count > cur:
+                inst_metric[inst_id] = sum_count
+
+        if covered >= remaining:
+            print("[INFO] All remaining instances covered; cancelling pending checks.")
+            for t in tasks:
+                t.cancel()
+            break
+
+    # Reap any cancelled tasks so their sockets return to the pool cleanly
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return inst_metric
 
 
 # ============================
 # Main identification logic
 # ============================
 
-def identify_server_sharing(all_instance_ids: List[str]) -> List[List[str]]:
+async def identify_server_sharing(all_instance_ids: List[str]) -> List[List[str]]:
     """
     Perform the full multi-iteration server sharing identification.
 
+    One aiohttp session (and its connection pool) lives for the whole
+    run, so later iterations reuse warm connections instead of paying
+    per-iteration session and pool construction.
+
     Args:
-      all_instance_ids: list of all known instance IDs participating in the experiment.
+      all_instance_ids: list of all known instance_ids participating in the experiment.
 
     Returns:
       A list of groups, where each group is a list of instance_ids that share a server.
@@ -163,67 +242,48 @@ def identify_server_sharing(all_instance_ids: List[str]) -> List[List[str]]:
     print(f"[INFO] Total instances: {len(remaining)}")
     print(f"[INFO] Using SERVER_SHARING_THRESHOLD = {SERVER_SHARING_THRESHOLD}")
 
-    while remaining:
-        print(f"\n[INFO] Remaining instances: {len(remaining)}")
-        # 1. Trigger mem-lock and see which instance actually handled it
-        lock_instance_id = call_lock_and_get_instance_id()
-
-        # If we failed to identify, retry
-        if lock_instance_id == "unknown":
-            print("[WARN] lock instance_id is unknown; retrying iteration.")
-            continue
-
-        # If this instance has already been grouped, skip and retry
-        if lock_instance_id not in remaining:
-            print(f"[INFO] lock instance_id {lock_instance_id} is already grouped; retrying.")
-            continue
-
-        print(f"[INFO] Using {lock_instance_id} as current lock instance.")
-
-        # 2. Issue multiple mem-checks in parallel
-        measurements: List[Dict[str, Any]] = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_CHECK_REQUESTS) as ex:
-            futures = [ex.submit(call_check_and_get_metric_and_id) for _ in range(NUM_CHECK_REQUESTS)]
-            for f in concurrent.futures.as_completed(futures):
-                result = f.result()
-                measurements.append(result)
-
-        # 3. Build a metric map for instances that are still remaining
-        #    (we keep the maximum sum_count observed per instance to reflect strongest slowdown)
-        inst_metric: Dict[str, float] = {}
-        for m in measurements:
-            inst_id = m["instance_id"]
-            sum_count = m["sum_count"]
+    connector = aiohttp.TCPConnector(limit=NUM_CHECK_REQUESTS, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        while remaining:
+            print(f"\n[INFO] Remaining instances: {len(remaining)}")
+            # 1. Trigger mem-lock and see which instance actually handled it
+            lock_instance_id = call_lock_and_get_instance_id()
 
-            if inst_id not in remaining:
+            # If we failed to identify, retry
+            if lock_instance_id == "unknown":
+                print("[WARN] lock instance_id is unknown; retrying iteration.")
                 continue
-            if sum_count == float("inf"):
+
+            # If this instance has already been grouped, skip and retry
+            if lock_instance_id not in remaining:
+                print(f"[INFO] lock instance_id {lock_instance_id} is already grouped; retrying.")
                 continue
 
-            if inst_id not in inst_metric:
-                inst_metric[inst_id] = sum_count
-            else:
-                inst_metric[inst_id] = max(inst_metric[inst_id], sum_count)
+            print(f"[INFO] Using {lock_instance_id} as current lock instance.")
 
-        print("[DEBUG] Mem-check metrics for remaining instances:")
-        for inst_id, metric in inst_metric.items():
-            print(f"  instance_id={inst_id}, sum_count={metric}")
+            # 2. Issue multiple mem-checks in parallel; the per-instance
+            #    max reduction happens inline as results complete.
+            inst_metric: Dict[str, float] = await run_check_round(session, remaining)
 
-        # 4. Form server-sharing group: lock_instance + all instances with metric >= threshold
-        group = {lock_instance_id}
-        for inst_id, metric in inst_metric.items():
-            if inst_id == lock_instance_id:
-                continue
-            if metric >= SERVER_SHARING_THRESHOLD:
-                group.add(inst_id)
+            print("[DEBUG] Mem-check metrics for remaining instances:")
+            for inst_id, metric in inst_metric.items():
+                print(f"  instance_id={inst_id}, sum_count={metric}")
+
+            # 4. Form server-sharing group: lock_instance + all instances with metric >= threshold
+            group = {lock_instance_id}
+            for inst_id, metric in inst_metric.items():
+                if inst_id == lock_instance_id:
+                    continue
+                if metric >= SERVER_SHARING_THRESHOLD:
+                    group.add(inst_id)
 
-        group = list(group)
-        print(f"[INFO] Identified server-sharing group: {group}")
+            group = list(group)
+            print(f"[INFO] Identified server-sharing group: {group}")
 
-        # 5. Remove grouped instances and record the group
-        for gid in group:
-            remaining.discard(gid)
-        groups.append(group)
+            # 5. Remove grouped instances and record the group
+            for gid in group:
+                remaining.discard(gid)
+            groups.append(group)
 
     return groups
 
@@ -242,7 +302,7 @@ def main():
         # ...
     ]
 
-    groups = identify_server_sharing(all_instance_ids)
+    groups = asyncio.run(identify_server_sharing(all_instance_ids))
 
     print("\n[FINAL RESULT] Server sharing groups:")
     for idx, g in enumerate(groups, start=1):
@@ -27,12 +27,25 @@ Output:
 """
 
 import argparse
-import concurrent.futures
+import asyncio
 import json
+import os
+import ssl
 import sys
+import time
 from typing import Dict, List, Optional, Tuple
 
-import requests
+import aiohttp
+
+# One TLS context shared by every /info connection; OpenSSL's per-context
+# client session cache lets repeat handshakes to the same host resume the
+# prior TLS session instead of redoing the asymmetric exchange.
+_TLS_CONTEXT = ssl.create_default_context()
+
+# On-disk cache of /info responses. cpu_brand/parsed_freq only change when
+# instances are redeployed, so repeat runs within the TTL skip the whole
+# /info fan-out.
+_INFO_CACHE_PATH = os.path.expanduser("~/.cache/shadow-hunting/info.json")
 
 
 # ---------------------------------------------------------------------------
@@ -70,6 +83,13 @@ def parse_args() -> argparse.Namespace:
         default=10.0,
         help="HTTP request timeout in seconds for /info (default: 10.0).",
     )
+    parser.add_argument(
+        "--info-cache-ttl",
+        type=float,
+        default=3600.0,
+        help="Seconds to trust cached /info responses; 0 disables the cache "
+             "(default: 3600).",
+    )
     return parser.parse_args()
 
 
@@ -94,17 +114,38 @@ def build_info_url(base_url: str, info_endpoint: str) -> str:
     return f"{base}/{ep}"
 
 
+def _load_info_cache() -> dict:
+    try:
+        with open(_INFO_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_info_cache(cache: dict) -> None:
+    """Rewrite the cache atomically so a crash never leaves it truncated."""
+    tmp_path = _INFO_CACHE_PATH + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(_INFO_CACHE_PATH), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, _INFO_CACHE_PATH)
+    except OSError as e:
+        print(f"[WARN] Could not write /info cache: {e}", file=sys.stderr)
+
+
 # ---------------------------------------------------------------------------
 # /info query and architecture grouping
 # ---------------------------------------------------------------------------
 
-def fetch_cpu_info(
+async def fetch_cpu_info(
+    session: aiohttp.ClientSession,
     base_url: str,
-    info_endpoint: str,
+    info_url: str,
     timeout: float,
 ) -> Tuple[Optional[str], Optional[float]]:
     """
-    Query base_url/info_endpoint and return (cpu_brand, parsed_freq).
+    Query the instance's prebuilt /info URL and return (cpu_brand, parsed_freq).
 
     Expected JSON:
         {
@@ -114,12 +155,13 @@ def fetch_cpu_info(
 
     Returns (None, None) on error or missing cpu_brand.
     """
-    info_url = build_info_url(base_url, info_endpoint)
     try:
-        resp = requests.get(info_url, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-    except (requests.RequestException, ValueError) as e:
+        async with session.get(
+            info_url, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"[WARN] Failed to fetch /info from {info_url}: {e}", file=sys.stderr)
         return None, None
 
@@ -138,6 +180,7 @@ def group_by_architecture(
     urls: List[str],
     info_endpoint: str,
     timeout: float,
+    cache_ttl: float = 0.0,
 ) -> Dict[Tuple[str, Optional[float]], List[str]]:
     """
     Query /info for each URL and group URLs by architecture key:
@@ -151,23 +194,54 @@ def group_by_architecture(
     """
     arch_to_urls: Dict[Tuple[str, Optional[float]], List[str]] = {}
 
-    def worker(u: str):
-        return u, fetch_cpu_info(u, info_endpoint, timeout)
-
-    workers = max(1, len(urls))  # one worker per URL; no external cap
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_url = {executor.submit(worker, u): u for u in urls}
-        for future in concurrent.futures.as_completed(future_to_url):
-            url, (brand, freq) = future.result()
-
-            if brand is None:
-                # If brand is missing, we treat it as "unknown"; freq is ignored.
-                arch_key = ("unknown", None)
-            else:
-                # Architecture = (cpu_brand, parsed_freq), even if parsed_freq is None.
-                arch_key = (brand, freq)
-
-            arch_to_urls.setdefault(arch_key, []).append(url)
+    # Build each /info URL once up front; the strip/join work is constant
+    # per URL, so there is no reason to redo it inside the fetch path.
+    info_urls = {u: build_info_url(u, info_endpoint) for u in urls}
+
+    async def fetch_all(fetch_urls: List[str]) -> List[Tuple[Optional[str], Optional[float]]]:
+        # A single event loop multiplexes every probe socket; no per-URL
+        # thread stacks, and the connector caches DNS lookups for hosts
+        # that share a resolver entry.
+        connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300, ssl=_TLS_CONTEXT)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(
+                *(fetch_cpu_info(session, u, info_urls[u], timeout) for u in fetch_urls)
+            )
+
+    # Serve from the on-disk cache where entries are fresh; only the rest
+    # hit the network.
+    cache = _load_info_cache()
+    now = time.time()
+    results: Dict[str, Tuple[Optional[str], Optional[float]]] = {}
+    to_fetch: List[str] = []
+    for url in urls:
+        entry = cache.get(url)
+        if cache_ttl > 0 and entry and now - entry.get("ts", 0.0) < cache_ttl:
+            results[url] = (entry.get("cpu_brand"), entry.get("parsed_freq"))
+        else:
+            to_fetch.append(url)
+
+    if len(results) > 0:
+        print(f"[INFO] {len(results)} /info responses served from cache; fetching {len(to_fetch)}.")
+
+    if to_fetch:
+        for url, (brand, freq) in zip(to_fetch, asyncio.run(fetch_all(to_fetch))):
+            results[url] = (brand, freq)
+            if brand is not None:
+                cache[url] = {"ts": now, "cpu_brand": brand, "parsed_freq": freq}
+        if cache_ttl > 0:
+            _save_info_cache(cache)
+
+    for url in urls:
+        brand, freq = results[url]
+        if brand is None:
+            # If brand is missing, we treat it as "unknown"; freq is ignored.
+            arch_key = ("unknown", None)
+        else:
+            # Architecture = (cpu_brand, parsed_freq), even if parsed_freq is None.
+            arch_key = (brand, freq)
+
+        arch_to_urls.setdefault(arch_key, []).append(url)
 
     # Logging summary
     for (brand, freq), urls_for_arch in arch_to_urls.items():
@@ -249,19 +323,20 @@ def deduplicate_by_server_within_arch_sets(
     cpu_sets: List[dict] = []
 
     for (cpu_brand, parsed_freq), urls in arch_to_urls.items():
-        group_to_rep: Dict[str, str] = {}
+        # One pass: keep the lexicographically smallest URL per server
+        # group, so the representative choice is deterministic regardless
+        # of completion order, and only the final output needs sorting.
+        reps_by_gid: Dict[tuple, str] = {}
 
         for url in urls:
-            if url in url_to_group:
-                gid = f"group-{url_to_group[url]}"
-            else:
-                # URL not covered by any server group; treat as its own singleton
-                gid = f"single-{url}"
-
-            if gid not in group_to_rep:
-                group_to_rep[gid] = url
+            gid = url_to_group.get(url)
+            # URL not covered by any server group is its own singleton
+            key = ("group", gid) if gid is not None else ("single", url)
+            prev = reps_by_gid.get(key)
+            if prev is None or url < prev:
+                reps_by_gid[key] = url
 
-        reps = list(group_to_rep.values())
+        reps = sorted(reps_by_gid.values())
 
         print(
             f"[INFO] Architecture (brand='{cpu_brand}', parsed_freq={parsed_freq}): "
@@ -272,7 +347,7 @@ def deduplicate_by_server_within_arch_sets(
             {
                 "cpu_brand": cpu_brand,
                 "parsed_freq": parsed_freq,
-                "instances": sorted(reps),
+                "instances": reps,
             }
         )
 
@@ -299,6 +374,7 @@ def main():
         urls=urls,
         info_endpoint=args.info_endpoint,
         timeout=args.timeout,
+        cache_ttl=args.info_cache_ttl,
     )
 
     # 3) Load server-sharing groups and build URL -> group_id mapping
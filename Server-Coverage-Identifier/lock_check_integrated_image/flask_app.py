@@ -1,17 +1,62 @@
 from flask import Flask, request, jsonify
 import subprocess
+import threading
 import time
 import re
 import os
 import uuid
 import logging
-from datetime import datetime, timezone  
+from datetime import datetime, timezone
 
 app = Flask(__name__)
 
 logging.basicConfig(level=logging.DEBUG)
 
 
+# Long-lived ./check worker. Forking the binary per request pays
+# fork+execve+dynamic-linker startup on every probe, which can dominate a
+# short measurement. The daemon maps the shared library once at startup,
+# then runs one measurement per "run" line on stdin and answers with a
+# single line of counts on stdout. The lock serializes access to the pipe
+# pair; if the daemon is unavailable or has died, callers fall back to
+# forking the binary per request.
+try:
+    _CHECK_DAEMON = subprocess.Popen(
+        ["./check", "--daemon"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        bufsize=0,
+    )
+except OSError:
+    _CHECK_DAEMON = None
+_CHECK_DAEMON_LOCK = threading.Lock()
+
+
+def run_check_once_bytes():
+    """
+    Run one mem-check measurement and return the raw stdout bytes,
+    via the persistent daemon when alive. The binary's output is
+    already bytes; keeping it that way lets /check hand the body to
+    Flask without a decode/re-encode copy.
+    """
+    if _CHECK_DAEMON is not None and _CHECK_DAEMON.poll() is None:
+        with _CHECK_DAEMON_LOCK:
+            _CHECK_DAEMON.stdin.write(b"run\n")
+            line = _CHECK_DAEMON.stdout.readline()
+        if line:
+            return line
+    proc = subprocess.Popen(["./check"], stdout=subprocess.PIPE)
+    data = proc.stdout.read()
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, "./check", output=data)
+    return data
+
+
+def run_check_once():
+    """Run one mem-check measurement and return its output as text."""
+    return run_check_once_bytes().decode("utf-8")
+
+
 def run_command_endpoint():
     """
     Execute a command passed via the 'cmd' query parameter.
@@ -36,9 +81,15 @@ def lock_3():
     """
     Invoke the memory-locking binary ./lock-3 and return its output.
     This endpoint is used to induce memory bus contention.
+    An optional ?hold=<seconds> extends the contention window so one
+    arming can cover several probe rounds without re-triggering /lock.
     """
+    argv = ["./lock-3"]
+    hold = request.args.get('hold', type=int)
+    if hold is not None:
+        argv.append(str(max(1, min(hold, 60))))
     try:
-        output = subprocess.check_output(["./lock-3"]).decode("utf-8")
+        output = subprocess.check_output(argv).decode("utf-8")
         return output, 200
     except subprocess.CalledProcessError as e:
         return e.output.decode(), 400
@@ -51,13 +102,60 @@ def check():
     This endpoint is used to measure memory access latency under contention.
     """
     try:
-        output = subprocess.check_output(["./check"]).decode("utf-8")
+        # Raw bytes pass straight through; no decode/re-encode pair.
+        output = run_check_once_bytes()
         return output, 200
     except subprocess.CalledProcessError as e:
         return e.output.decode(), 400
 
 
+@app.route('/hostinfo')
+def hostinfo():
+    """
+    Return cheap host-identity signals: the head of /proc/cpuinfo and the
+    kernel boot_id. Instances reporting different boot_ids cannot share a
+    physical host, so callers can pre-cluster instances with one cheap GET
+    each before running the expensive lock/check protocol pairwise.
+    """
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpuinfo = f.read(512)
+    except OSError:
+        cpuinfo = ""
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            boot_id = f.read().strip()
+    except OSError:
+        boot_id = ""
+    return jsonify({"cpuinfo": cpuinfo, "boot_id": boot_id})
+
+
+@app.route('/check_batch')
+def check_batch():
+    """
+    Invoke ./check n times and return the outputs as a JSON array.
+    Batching amortizes one HTTP round trip and Flask dispatch over n
+    measurements when a caller wants several samples per probe.
+    Example:
+      /check_batch?n=5
+    """
+    try:
+        n = int(request.args.get('n', 1))
+    except (TypeError, ValueError):
+        return "Invalid 'n' parameter.", 400
+    n = max(1, min(n, 32))
+
+    outputs = []
+    try:
+        for _ in range(n):
+            outputs.append(run_check_once())
+    except subprocess.CalledProcessError as e:
+        return e.output.decode(), 400
+    return jsonify(outputs)
+
+
 
 if __name__ == '__main__':
+    # Local development only; the container serves via gunicorn (see Dockerfile)
     app.run(host='0.0.0.0', port=8080)
 
@@ -4,8 +4,18 @@
 #include <stdint.h> // Include this header for uintptr_t
 #include <time.h> // Include time.h for measuring elapsed time
 
-int main() {
+int main(int argc, char **argv) {
     const size_t N = 64; // Example size, adjust based on your needs
+
+    // Contention duration in seconds; defaults to 1 but can be extended
+    // (e.g. by /lock?hold=) so one arming covers several probe rounds.
+    long hold_seconds = 1;
+    if (argc > 1) {
+        long parsed = strtol(argv[1], NULL, 10);
+        if (parsed > 0) {
+            hold_seconds = parsed;
+        }
+    }
     char *char_ptr = malloc((N+1) * 8); // Allocate memory, assuming 8 bytes per block
     if (!char_ptr) {
         perror("Failed to allocate memory");
@@ -21,7 +31,7 @@ int main() {
     // Get the start time
     time_t start_time = time(NULL);
 
-    while (time(NULL) - start_time < 1) { // Check the elapsed time
+    while (time(NULL) - start_time < hold_seconds) { // Check the elapsed time
         for (size_t i = 0; i < N; ++i) {
             atomic_fetch_add(&unaligned_addr[i], 1); // Increment each atomic_int by 1
         }